@@ -0,0 +1,39 @@
+"""
+    Checks the Android clock synchronization against FakePhoneServer, whose
+    clock runs 1.5 s ahead of the host and drifts by 200 ppm over a jittery link.
+
+    The offset and the recording start time must be recovered to within
+    10 ms, also when the phone reports its start time after the sync
+    timeout and the report only arrives with the next sync burst.
+"""
+from connection import SocketConnection
+from connection.fake_phone_server import FakePhoneServer
+from time import sleep
+import logging
+logging.getLogger().setLevel(logging.INFO)
+
+OFFSET = 1_500_000_000
+DRIFT = 200e-6
+TOLERANCE = 10_000_000
+
+def check(start_delay):
+    with FakePhoneServer(offset=OFFSET, drift=DRIFT, delay=0.004, start_delay=start_delay) as phone:
+        connection = SocketConnection(*phone.address, sync_clock=True, sync_timeout=0.5).connect()
+        connection.start_recording()
+        sleep(5)
+        connection.stop_recording()
+
+    estimate = connection.clock.estimate()
+    true_offset = OFFSET + DRIFT * (estimate.reference - phone._epoch)
+    offset_error = estimate.offset - true_offset
+    start_error = connection.host_start_time() - (phone.start_time - true_offset)
+    print(f"Start report delayed {start_delay} s")
+    print(f"Offset error: {offset_error / 1e6:.3f} ms")
+    print(f"Drift error: {(estimate.drift - DRIFT) * 1e6:.2f} ppm")
+    print(f"Start time error: {start_error / 1e6:.3f} ms")
+    assert connection.phone_start_time == phone.start_time
+    assert abs(offset_error) < TOLERANCE
+    assert abs(start_error) < TOLERANCE
+
+check(start_delay=0)
+check(start_delay=1)
@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from connection import LumixConnection, GoProConnection, MuseConnection, SocketConnection
+from connection import LumixConnection, GoProConnection, MuseConnection, SocketConnection, TriggerEngine, connect_all
+from camera_control import latency, UIWorker
+from camera_control.eeg_dashboard import EEGDashboard
+from postprocessing import SessionManifest, EEGEntry
 import time
 
 class App:
@@ -11,12 +14,17 @@ class App:
         self.entities = ["Lumix", "Android_WiFi", "Muse", "GoPro"]
         self.table_data = []
         self.connections = []
+        self.trigger_engine = TriggerEngine(self.connections)
+        self.start_report = None
+        self.session = None
+        self.frame_logs = {}
+        self.worker = UIWorker(root)
 
         instructions = (
             "Instructions:\n"
             "1) Click add device at the bottom\n"
             "2) Double click on the row in a table to modify the row\n"
-            "3) Add parameters like IP address, IP address and port or name of a Muse device\n"
+            "3) Add parameters like IP address, IP address and port (append :sync for clock sync) or name of a Muse device\n"
             "4) Connect\n"
             "5) Start recording\n"
             "6) Stop recording\n"
@@ -41,14 +49,49 @@ class App:
         self.delete_row_button = tk.Button(root, text="Delete Device", command=self.delete_last_row)
         self.delete_row_button.grid(row=3, column=0, columnspan=4, pady=10, sticky='ew')
 
-        self.add_row_button = tk.Button(root, text="Connect devices", command=self.connect_devices)
-        self.add_row_button.grid(row=4, column=0, columnspan=4, pady=10, sticky='ew')
+        self.connect_button = tk.Button(root, text="Connect devices", command=self.connect_devices)
+        self.connect_button.grid(row=4, column=0, columnspan=4, pady=10, sticky='ew')
 
-        self.add_row_button = tk.Button(root, text="Start recordings", command=self.start_recordings)
-        self.add_row_button.grid(row=5, column=0, columnspan=4, pady=10, sticky='ew')
+        self.start_button = tk.Button(root, text="Start recordings", command=self.start_recordings)
+        self.start_button.grid(row=5, column=0, columnspan=4, pady=10, sticky='ew')
 
-        self.add_row_button = tk.Button(root, text="Stop recordings", command=self.stop_recordings)
-        self.add_row_button.grid(row=6, column=0, columnspan=4, pady=10, sticky='ew')
+        self.stop_button = tk.Button(root, text="Stop recordings", command=self.stop_recordings)
+        self.stop_button.grid(row=6, column=0, columnspan=4, pady=10, sticky='ew')
+
+        self.status = tk.StringVar(value="Idle")
+        self.status_label = tk.Label(root, textvariable=self.status, anchor='w')
+        self.status_label.grid(row=7, column=0, columnspan=4, padx=10, pady=5, sticky='ew')
+
+        # Live rate, dropped packets and channel RMS of the connected Muses.
+        self.dashboard = EEGDashboard(root)
+        self.dashboard.grid(row=8, column=0, columnspan=4, padx=10, pady=5, sticky='ew')
+
+    def run_in_background(self, progress, function, on_done):
+        """Runs a blocking device call on the worker, keeping the window responsive.
+
+        The action buttons are disabled and the status line shows progress
+        until the call returns; on_done then runs on the Tk thread.
+        """
+        buttons = (self.connect_button, self.start_button, self.stop_button)
+        for button in buttons:
+            button.config(state=tk.DISABLED)
+        self.status.set(progress)
+
+        def finish():
+            for button in buttons:
+                button.config(state=tk.NORMAL)
+
+        def done(result):
+            finish()
+            self.status.set("Idle")
+            on_done(result)
+
+        def failed(error):
+            finish()
+            self.status.set(f"Failed: {error}")
+            messagebox.showerror("Error", f"{progress}\n{error}")
+
+        self.worker.submit(function, on_done=done, on_error=failed)
 
 
     def delete_last_row(self):
@@ -114,12 +157,23 @@ class App:
 
     def connect_devices(self):
         device_list = self.get_device_list()
+        print("Connecting devices:", device_list)
+        self.run_in_background("Connecting devices...", lambda: self.reconnect(device_list), self.devices_connected)
+
+    def reconnect(self, device_list):
+        # Devices of an earlier connect are released first, so they can be found again.
+        for connection in self.connections:
+            connection.disconnect()
         self.connections = []
+        return connect_all(self.make_connections(device_list))
+
+    def make_connections(self, device_list):
+        connections = []
         for entity in device_list:
             device = entity[0]
             params = entity[1]
             if device == "Lumix":
-                self.connections.append(LumixConnection(params).connect())
+                connections.append(LumixConnection(params))
             elif device == "Android_WiFi":
                 l = params.split(":")
                 ip = l[0]
@@ -127,29 +181,90 @@ class App:
                     port = 3000
                 else:
                     port = int(l[1])
-                self.connections.append(SocketConnection(ip, port).connect())
+                # "ip:port:sync" enables clock synchronization with the recorder app
+                sync_clock = "sync" in l[2:]
+                connections.append(SocketConnection(ip, port, sync_clock))
             elif device == "Muse":
-                self.connections.append(MuseConnection(params).connect())
+                connections.append(MuseConnection(params))
             elif device == "GoPro":
-                self.connections.append(GoProConnection().connect())
+                connections.append(GoProConnection())
             else:
                 assert False
-        #GoProConnection.refresh()
+        return connections
 
-        print("Connecting devices:", device_list)
-        messagebox.showinfo("Connect Devices", f"Connecting devices: {device_list}")
+    def devices_connected(self, results):
+        self.connections = [result.connection for result in results if result.ok]
+        self.trigger_engine = TriggerEngine(self.connections)
+        self.dashboard.clear()
+        for connection in self.connections:
+            if isinstance(connection, MuseConnection):
+                self.dashboard.add(str(connection), connection.buffer)
+        summary = "\n".join(str(result) for result in results)
+        messagebox.showinfo("Connect Devices", f"Connecting devices:\n{summary}")
 
     def start_recordings(self):
-        for connection in self.connections:
-            connection.start_recording()
         print("Starting recordings")
-        messagebox.showinfo("Start Recordings", "Starting recordings...")
+        self.run_in_background("Starting recordings...", self.start_and_log, self.recordings_started)
+
+    def start_and_log(self):
+        report = self.trigger_engine.start_recordings()
+        self.session = time.strftime('%Y-%m-%d-%H.%M.%S', time.gmtime())
+        # Preview frames are logged while recording, so video frames can be aligned to the EEG.
+        self.frame_logs = {}
+        for device, connection in enumerate(self.connections):
+            filename = connection.start_frame_log(f"session_{self.session}_{device}.framelog")
+            if filename is not None:
+                self.frame_logs[connection] = filename
+        return report
+
+    def recordings_started(self, report):
+        self.start_report = report
+        summary = "\n".join(report.summary())
+        messagebox.showinfo("Start Recordings", f"Starting recordings...\n{summary}")
 
     def stop_recordings(self):
-        for connection in self.connections:
-            connection.stop_recording()
         print("Stopping recordings")
-        messagebox.showinfo("Stop Recordings", "Stopping recordings...")
+        self.run_in_background("Stopping recordings...", self.stop_and_save, self.recordings_stopped)
+
+    def stop_and_save(self):
+        for connection in self.connections:
+            connection.stop_frame_log()
+        report = self.trigger_engine.stop_recordings()
+        session = self.session or time.strftime('%Y-%m-%d-%H.%M.%S', time.gmtime())
+        latency.dump_json(f"latency_{session}.json")
+        self.write_manifest(f"session_{session}", report)
+        self.session = None
+        self.frame_logs = {}
+        return report
+
+    def recordings_stopped(self, report):
+        summary = "\n".join(report.summary())
+        messagebox.showinfo("Stop Recordings", f"Stopping recordings...\n{summary}")
+
+    def write_manifest(self, session, stop_report):
+        """Writes the session manifest that post-processing aligns the recordings with."""
+        manifest = SessionManifest(session)
+        for connection in self.connections:
+            if isinstance(connection, MuseConnection):
+                manifest.eeg.append(EEGEntry(str(connection), connection.filename))
+        for report, key in ((self.start_report, "trigger_time"), (stop_report, "stop_time")):
+            if report is None:
+                continue
+            for connection, result in zip(self.connections, report.results):
+                if isinstance(connection, MuseConnection) or result.ack is None:
+                    continue
+                manifest.add_device(str(connection), **{key: report.to_wall_clock(result.ack)})
+        for connection in self.connections:
+            # Phones with clock sync report when recording actually began.
+            if isinstance(connection, SocketConnection) and connection.host_start_time() is not None:
+                manifest.add_device(str(connection), trigger_time=connection.host_start_time() / 1e9)
+        for connection in self.connections:
+            fps, frame_log = connection.frame_rate(), self.frame_logs.get(connection)
+            if fps is not None or frame_log is not None:
+                manifest.add_device(str(connection), fps=fps, frame_log=frame_log)
+        manifest.notes["latency"] = latency.summary()
+        manifest.save(f"{session}.json")
+        print(f"Wrote session manifest {session}.json")
 
     def get_device_list(self):
         return [(data["device"].get(), data["parameters"].get()) for data in self.table_data]
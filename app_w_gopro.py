@@ -1,15 +1,10 @@
 import tkinter as tk
 from tkinter import messagebox
-import numpy as np
-import pandas as pd
-import os
-from time import time, strftime, gmtime
-from muselsl.stream import find_muse
-from muselsl import backends
-from muselsl.muse import Muse
-from camera_control.lumix_control import LumixControl
-from camera_control import GoProControl
-import asyncio
+from time import time, perf_counter, strftime, gmtime
+from camera_control.lumix_control import LumixControl, video_quality_fps
+from camera_control.eeg_dashboard import EEGDashboard
+from camera_control import GoProControl, BackgroundLoop, UIWorker, MuseRecorder, latency
+from postprocessing import SessionManifest, EEGEntry
 import logging
 
 logging.getLogger().setLevel(logging.INFO)
@@ -65,8 +60,45 @@ class App:
         self.stop_recording_button = tk.Button(root, text="Stop Recording", command=self.stop_recording)
         self.stop_recording_button.grid(row=8, column=0, columnspan=2, pady=10, sticky='ew')
 
+        self.progress = tk.StringVar()
+        self.progress_label = tk.Label(root, textvariable=self.progress, anchor='w')
+        self.progress_label.grid(row=9, column=0, columnspan=2, padx=10, pady=5, sticky='ew')
+        self.worker = UIWorker(root)
+
+        self.dashboard = EEGDashboard(root)
+        self.dashboard.grid(row=10, column=0, columnspan=2, padx=10, pady=5, sticky='ew')
+
+    def run_in_background(self, progress, function, on_done):
+        """
+            Runs a blocking device call on the worker so the window keeps responding.
+
+            The buttons are disabled until the call returns; on_done then runs on the Tk thread.
+        """
+        buttons = (self.connect_camera_button, self.connect_eeg_button,
+                   self.start_recording_button, self.stop_recording_button)
+        for button in buttons:
+            button.config(state=tk.DISABLED)
+        self.progress.set(progress)
+
+        def finish():
+            for button in buttons:
+                button.config(state=tk.NORMAL)
+            self.progress.set("")
+
+        def done(result):
+            finish()
+            on_done()
+
+        def failed(error):
+            finish()
+            messagebox.showerror("Error", f"{progress}\n{error}")
+
+        self.worker.submit(function, on_done=done, on_error=failed)
+
     def connect_camera(self):
-        connect_cameras()
+        self.run_in_background("Connecting cameras...", connect_cameras, self.camera_connected)
+
+    def camera_connected(self):
         self.camera_status.set("Connected")
         messagebox.showinfo("Info", "Camera Connected")
 
@@ -74,36 +106,46 @@ class App:
         eeg1_data = self.eeg1_data.get()
         eeg2_data = self.eeg2_data.get()
         if eeg1_data and eeg2_data:
-            connect_EEG(fnames=["1.csv", "2.csv"], names=[eeg1_data, eeg2_data])
-            self.eeg_status.set("Connected")
-            messagebox.showinfo("Info", f"EEG Connected with data: EEG1={eeg1_data}, EEG2={eeg2_data}")
+            message = f"EEG Connected with data: EEG1={eeg1_data}, EEG2={eeg2_data}"
+            self.run_in_background("Connecting EEG...",
+                                   lambda: connect_EEG(fnames=["1.csv", "2.csv"], names=[eeg1_data, eeg2_data]),
+                                   lambda: self.eeg_connected(message))
         elif eeg1_data:
-            connect_EEG(fnames=["1.csv"], names=[eeg1_data])
-            self.eeg_status.set("Connected")
-            messagebox.showinfo("Info", f"EEG Connected with data: EEG1={eeg1_data}")
+            message = f"EEG Connected with data: EEG1={eeg1_data}"
+            self.run_in_background("Connecting EEG...",
+                                   lambda: connect_EEG(fnames=["1.csv"], names=[eeg1_data]),
+                                   lambda: self.eeg_connected(message))
         else:
             messagebox.showwarning("Warning", "Please enter data for both EEG1 and EEG2")
 
+    def eeg_connected(self, message):
+        self.eeg_status.set("Connected")
+        self.dashboard.clear()
+        for device, buffer in enumerate(buffers):
+            self.dashboard.add(f"Muse {device}", buffer)
+        messagebox.showinfo("Info", message)
+
     def start_recording(self):
         if self.camera_status.get() == "Connected" and self.eeg_status.get() == "Connected":
-            start_data_recording()
-            messagebox.showinfo("Info", "Recording Started")
+            self.run_in_background("Starting recording...", start_data_recording,
+                                   lambda: messagebox.showinfo("Info", "Recording Started"))
         else:
             messagebox.showwarning("Warning", "Please connect both Camera and EEG before recording")
 
     def stop_recording(self):
         if self.camera_status.get() == "Connected" and self.eeg_status.get() == "Connected":
-            stop_recording_data()
-            messagebox.showinfo("Info", "Recording Stopped")
+            self.run_in_background("Stopping recording and writing files...", stop_recording_data,
+                                   lambda: messagebox.showinfo("Info", "Recording Stopped"))
         else:
             messagebox.showwarning("Warning", "Recording is not in progress or devices are not connected")
 
-eeg_samples = []
-timestamps = []
-muses = []
+recorder = None
+buffers = []
+manifest = None
 t_init = 0
 video_init = 0
 control = None
+stream = None
 gopro_1 = None
 gopro_2 = None
 filenames = []
@@ -118,41 +160,22 @@ filenames = []
 def connect_EEG(fnames:list,
             backend='auto',
             interface=None,
-            names=None):
-    global eeg_samples
-    global timestamps
-    global muses
+            names=None,
+            output_format='csv'):
+    global recorder
+    global buffers
     global filenames
-    filenames = fnames
-    devices_number = len(names)
-    addresses = [0 for i in range(devices_number)]
     if backend == 'bluemuse':
         raise (NotImplementedError(
             'Direct record not supported with BlueMuse backend. Use record after starting stream instead.'
         ))
-    for device in range(devices_number):
-        found_muse = find_muse(names[device], backend)
-        if not found_muse:
-            print('Muse could not be found')
-            return
-        else:
-            addresses[device] = found_muse['address']
-            names[device] = found_muse['name']
-            print('Connecting to %s : %s...' % (names[device] if names[device] else 'Muse', addresses[device]))
-    for device in range(len(filenames)):
-        filenames[device] = os.path.join(
-            os.getcwd(),
-            (f"recording{device}_%s.csv" % strftime("%Y-%m-%d-%H.%M.%S", gmtime())))
-    eeg_samples = [[] for i in range(devices_number)]
-    timestamps = [[] for i in range(devices_number)]
-    muses = []
-    for device in range(devices_number):
-        def save_eeg(new_samples, new_timestamps):
-            eeg_samples[device].append(new_samples)
-            timestamps[device].append(new_timestamps)
-        muses.append(Muse(addresses[device], save_eeg, backend=backend))
-    for muse in muses:
-        muse.connect()
+    # All Muses are found by one scan and stream through the shared background loop.
+    recorder = MuseRecorder(names, output_format)
+    if not recorder.connect():
+        print('Muse could not be found')
+        return
+    buffers = recorder.buffers
+    filenames = recorder.filenames
 
 def connect_cameras(IP="192.168.54.1"):
     global control
@@ -163,63 +186,81 @@ def connect_cameras(IP="192.168.54.1"):
     gopro_1 = GoProControl()
     gopro_2 = GoProControl()
 
-    device_list = asyncio.run(GoProControl.search_device())
+    loop = BackgroundLoop.shared()
+    device_list = loop.run(GoProControl.search_device(count=2))
 
     if len(device_list) > 0:
-        asyncio.run(gopro_1.connect(device_list.popitem()[1]))
-        asyncio.run(gopro_2.connect(device_list.popitem()[1]))
+        loop.run(gopro_1.connect(device_list.popitem()[1]))
+        loop.run(gopro_2.connect(device_list.popitem()[1]))
 
 
 def start_data_recording():
-    global muses
+    global recorder
     global control
     global gopro_1
     global gopro_2
     global t_init
     global video_init
+    global manifest
+    global stream
 
+    manifest = SessionManifest("session_%s" % strftime("%Y-%m-%d-%H.%M.%S", gmtime()))
+    # Both GoPros are fired with one gather on the shared loop.
+    gopros = BackgroundLoop.shared().gather(gopro_1.start_shutter(), gopro_2.start_shutter())
     control.video_record_start()
-    asyncio.run(gopro_1.start_shutter())
-    print("GoPro1 started at time t= %.3f" % time())
-    asyncio.run(gopro_2.start_shutter())
-    print("GoPro2 started at time t= %.3f" % time())
+    lumix_started = time()
+    acks = gopros.result()
+    lumix = f"Lumix {control.cam_ip}"
+    manifest.add_device(lumix, trigger_time=lumix_started, fps=video_quality_fps(control.get_video_quality()))
+    fps = BackgroundLoop.shared().gather(gopro_1.get_fps(), gopro_2.get_fps()).result()
+    for gopro, ack, rate in zip((gopro_1, gopro_2), acks, fps):
+        manifest.add_device(gopro.name, trigger_time=time() - (perf_counter() - ack.received), fps=rate)
+    # Preview frames are logged while recording, so video frames can be aligned to the EEG.
+    try:
+        stream = control.open_stream()
+        frame_log = manifest.session + "_lumix.framelog"
+        stream.start_frame_log(frame_log, lumix)
+        manifest.add_device(lumix, frame_log=frame_log)
+    except OSError as e:
+        print('Could not open the Lumix preview stream: %s' % e)
+    print("GoPros started at time t= %.3f" % time())
     video_init = time()
-    for muse in muses:
-        muse.start()
+    recorder.start()
     t_init = time()
     print('Start video recording at time t= %.3f' % video_init)
     print('Start recording at time t=%.3f' % t_init)
 
 def stop_recording_data():
-    global eeg_samples
-    global timestamps
-    global muses
+    global recorder
     global control
     global t_init
     global video_init
     global filenames
-    
-    for muse in muses:
-        muse.stop()
-    asyncio.run(gopro_1.stop_shutter())
-    asyncio.run(gopro_2.stop_shutter())
+    global manifest
+    global stream
+
+    if manifest is None:
+        # Stopped without a successful start; the stop times and recordings are still worth keeping.
+        manifest = SessionManifest("session_%s" % strftime("%Y-%m-%d-%H.%M.%S", gmtime()))
+    if stream is not None:
+        stream.stop()
+        stream = None
+    recorder.stop()
+    acks = BackgroundLoop.shared().gather(gopro_1.stop_shutter(), gopro_2.stop_shutter()).result()
     control.video_record_stop()
-    for muse in muses:
-        muse.disconnect()
-    for device in range(len(muses)):
-        timestamps[device] = np.concatenate(timestamps[device])
-        eeg_samples[device] = np.concatenate(eeg_samples[device], 1).T
-        recording = pd.DataFrame(
-            data=eeg_samples[device], columns=['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX'])
-        recording['timestamps'] = timestamps[device]
-
-        directory = os.path.dirname(filenames[device])
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-
-        recording.to_csv(filenames[device], float_format='%.3f')
+    manifest.add_device(f"Lumix {control.cam_ip}", stop_time=time())
+    for gopro, ack in zip((gopro_1, gopro_2), acks):
+        manifest.add_device(gopro.name, stop_time=time() - (perf_counter() - ack.received))
+    recorder.close()
+    for device in range(len(filenames)):
         print('Done - wrote file: ' + filenames[device] + '.')
         print('Time difference between Muse and Video: ', t_init - video_init)
+    latency.dump_json("latency_%s.json" % strftime("%Y-%m-%d-%H.%M.%S", gmtime()))
+    manifest.eeg = [EEGEntry(f"Muse {device}", filename) for device, filename in enumerate(filenames)]
+    manifest.notes["latency"] = latency.summary()
+    manifest.save(manifest.session + ".json")
+    print('Wrote session manifest ' + manifest.session + '.json')
+    manifest = None
 
 if __name__ == "__main__":
     root = tk.Tk()
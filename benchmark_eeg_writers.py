@@ -0,0 +1,45 @@
+from camera_control.eeg_writer import WRITERS, make_writer, read_recording
+import numpy as np
+import tempfile
+import time
+import os
+
+"""
+    Compares write throughput and file size of the EEG output formats.
+
+    Feeds each writer the same synthetic session, chunked the way the Muse
+    callback delivers it (5 channels x 12 samples at 256 Hz), and checks how
+    much timestamp precision survives the round trip.
+"""
+
+MINUTES = 30
+SAMPLING_RATE = 256
+CHUNK = 12
+
+chunks_number = MINUTES * 60 * SAMPLING_RATE // CHUNK
+rng = np.random.default_rng(0)
+samples = rng.normal(0, 100, size=(5, chunks_number * CHUNK))
+timestamps = time.time() + np.arange(chunks_number * CHUNK) / SAMPLING_RATE
+
+print(f"{MINUTES} minutes of EEG, {chunks_number * CHUNK} samples per format\n")
+print(f"{'format':<10}{'seconds':>10}{'samples/s':>14}{'size MB':>10}{'max ts error':>16}")
+
+with tempfile.TemporaryDirectory() as directory:
+    for output_format in WRITERS:
+        try:
+            writer = make_writer(os.path.join(directory, "benchmark"), output_format).start()
+        except ImportError as e:
+            print(f"{output_format:<10}skipped: {e}")
+            continue
+
+        t_start = time.perf_counter()
+        for chunk in range(chunks_number):
+            window = slice(chunk * CHUNK, (chunk + 1) * CHUNK)
+            writer.write(samples[:, window], timestamps[window])
+        writer.close()
+        elapsed = time.perf_counter() - t_start
+
+        size = os.path.getsize(writer.filename) / 1e6
+        _, read_timestamps = read_recording(writer.filename)
+        error = np.max(np.abs(np.asarray(read_timestamps) - timestamps))
+        print(f"{output_format:<10}{elapsed:>10.2f}{len(timestamps) / elapsed:>14.0f}{size:>10.1f}{error:>16.2e}")
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from time import time
+from bleak import BleakScanner, BLEDevice, AdvertisementData
+from camera_control.device_registry import DeviceRegistry, KnownDevice
+
+GOPRO_NAME = re.compile(r"GoPro [A-Z0-9]{4}")
+MUSE_NAME = re.compile(r"Muse")
+
+def muse_name(name: str = None) -> re.Pattern:
+    """
+        Pattern for a Muse with the given name, or any Muse when name is empty,
+        with the same rules as muselsl's find_muse.
+    """
+    if name:
+        return re.compile(re.escape(name) + "$")
+    return MUSE_NAME
+
+@dataclass
+class Advertisement:
+    """
+        Last advertisement seen from a device.
+
+        Attributes:
+        - device (BLEDevice): Device that can be passed to BleakClient.
+        - data (AdvertisementData): Advertisement contents.
+        - seen (float): time() the advertisement was received.
+    """
+    device: BLEDevice
+    data: AdvertisementData
+    seen: float
+
+    @property
+    def name(self) -> str:
+        return self.device.name or self.data.local_name
+
+    @property
+    def address(self) -> str:
+        return self.device.address
+
+
+class BLEDiscovery:
+    """
+        One BLE scan for every device of the rig.
+
+        The scanner streams advertisements to a callback that matches device
+        names against the requested patterns and stops the scan as soon as
+        enough devices of each pattern were seen, instead of always waiting
+        for a fixed discovery timeout. Advertisements are cached, so devices
+        found by an earlier scan are handed out without scanning again.
+
+        Devices found by a scan are stored in the DeviceRegistry. When the
+        registry already knows enough devices, they are returned as
+        KnownDevice without scanning at all; if connecting to one fails,
+        rescan() finds it again.
+
+        Scans run on the shared BackgroundLoop and are serialized, since the
+        adapter can only run one scan at a time; callers waiting on the lock
+        usually find their devices in the cache afterwards.
+
+        Use BLEDiscovery.shared() to get the process-wide instance.
+
+        Object Attributes:
+        - max_age (float): Seconds a cached advertisement is trusted.
+        - registry (DeviceRegistry): Persisted addresses, None disables it.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_age: float = 60, registry: DeviceRegistry = None):
+        self.max_age = max_age
+        self.registry = registry
+        self._cache: dict[str, Advertisement] = {}
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def shared(cls) -> "BLEDiscovery":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(registry=DeviceRegistry.shared())
+            return cls._shared
+
+    def cached(self, pattern: re.Pattern) -> dict[str, BLEDevice]:
+        """
+            Devices matching the pattern whose advertisement is recent enough.
+        """
+        now = time()
+        return {name: advertisement.device for name, advertisement in self._cache.items()
+                if now - advertisement.seen <= self.max_age and pattern.match(name)}
+
+    def forget(self, name: str = None, registry: bool = False):
+        """
+            Drops one device, or every device, from the cache.
+
+            With registry, the device's known address is dropped as well.
+        """
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name, None)
+            if registry and self.registry is not None:
+                self.registry.forget(name)
+
+    def remember(self, name: str, address: str):
+        """
+            Marks a device as seen, e.g. after connecting to it by its known address.
+        """
+        if self.registry is not None:
+            self.registry.remember(name, "ble", address)
+
+    async def find(self, pattern: re.Pattern, count: int = None, timeout: float = 10,
+                   use_registry: bool = True) -> dict[str, BLEDevice]:
+        """
+            Finds devices whose name matches the pattern.
+
+            Arguments:
+            - pattern (re.Pattern): Name pattern, matched from the start of the name.
+            - count (int): Number of devices wanted. None scans for the whole timeout.
+            - timeout (float): Maximum scan time in seconds.
+            - use_registry (bool): Whether known addresses may answer instead of a scan.
+
+            Returns:
+            - devices (dict): Device name to BLEDevice.
+        """
+        return (await self.find_all({pattern: count}, timeout, use_registry))[pattern]
+
+    async def find_all(self, wanted: dict[re.Pattern, int], timeout: float = 10,
+                       use_registry: bool = True) -> dict[re.Pattern, dict[str, BLEDevice]]:
+        """
+            Finds devices for several patterns with a single scan.
+
+            Arguments:
+            - wanted (dict): Number of devices wanted per name pattern.
+            A count of None keeps scanning for the whole timeout.
+            - timeout (float): Maximum scan time in seconds.
+            - use_registry (bool): Whether known addresses may answer instead of a scan,
+            e.g. False after a known address did not work.
+
+            Returns:
+            - devices (dict): For each pattern, device name to BLEDevice.
+        """
+        async with self._lock:
+            found = {pattern: self.cached(pattern) for pattern in wanted}
+
+            def complete(found):
+                return all(count is not None and len(found[pattern]) >= count
+                           for pattern, count in wanted.items())
+
+            if complete(found):
+                logging.info("Discovery answered from cache.")
+                return found
+
+            if use_registry and self.registry is not None:
+                known = {pattern: {**{name: KnownDevice(name, address)
+                                      for name, address in self.registry.find("ble", pattern).items()},
+                                   **devices}
+                         for pattern, devices in found.items()}
+                if complete(known):
+                    logging.info("Discovery answered from the device registry.")
+                    return known
+
+            done = asyncio.Event()
+
+            def on_advertisement(device: BLEDevice, data: AdvertisementData):
+                advertisement = Advertisement(device, data, time())
+                name = advertisement.name
+                if not name:
+                    return
+                self._cache[name] = advertisement
+                for pattern, devices in found.items():
+                    if name not in devices and pattern.match(name):
+                        logging.info(f"Found device: {name}")
+                        devices[name] = device
+                if complete(found):
+                    done.set()
+
+            logging.info("Discovering.")
+            async with BleakScanner(detection_callback=on_advertisement):
+                try:
+                    await asyncio.wait_for(done.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            if self.registry is not None:
+                for devices in found.values():
+                    for name, device in devices.items():
+                        self.registry.remember(name, "ble", device.address, save=False)
+                self.registry.save()
+            return found
+
+    async def rescan(self, name: str, timeout: float = 10) -> BLEDevice:
+        """
+            Scans for a device whose known address did not work.
+
+            Returns:
+            - device (BLEDevice): The device, or None if it was not seen.
+        """
+        self.forget(name, registry=True)
+        found = await self.find(re.compile(re.escape(name) + "$"), 1, timeout)
+        return found.get(name)
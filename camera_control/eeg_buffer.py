@@ -0,0 +1,152 @@
+import numpy as np
+
+class EEGBuffer:
+    """
+        Growable EEG sample buffer that doubles its capacity when full.
+
+        Callbacks copy each chunk into preallocated arrays by slice, so no
+        per-packet objects are kept and there is no concatenation at the end.
+        Samples are stored row-wise (one row per sample, one column per
+        channel) next to a float64 timestamps column.
+
+        Object Attributes:
+        - n_channels (int): Number of EEG channels per sample.
+        - dtype: Sample dtype, float64 by default. Timestamps are always float64.
+    """
+
+    def __init__(self, n_channels: int = 5, capacity: int = 256 * 60, dtype=np.float64):
+        self.n_channels = n_channels
+        self.dtype = dtype
+        self._samples = np.empty((capacity, n_channels), dtype=dtype)
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._timestamps)
+
+    def append(self, samples: np.ndarray, timestamps: np.ndarray):
+        """
+            Copies one chunk as delivered by the Muse callback.
+
+            Arguments:
+            - samples (np.ndarray): Array of shape (channels, n).
+            - timestamps (np.ndarray): Array of shape (n,).
+        """
+        n = len(timestamps)
+        end = self._size + n
+        if end > self.capacity:
+            self._grow(end)
+        self._samples[self._size:end] = samples.T
+        self._timestamps[self._size:end] = timestamps
+        self._size = end
+
+    def _grow(self, minimum: int):
+        capacity = max(self.capacity * 2, minimum)
+        samples = np.empty((capacity, self.n_channels), dtype=self.dtype)
+        samples[:self._size] = self._samples[:self._size]
+        timestamps = np.empty(capacity, dtype=np.float64)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        self._samples = samples
+        self._timestamps = timestamps
+
+    @property
+    def samples(self) -> np.ndarray:
+        """
+            View of all samples, shape (n, channels). Invalidated when the buffer grows.
+        """
+        return self._samples[:self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """
+            View of all timestamps, shape (n,). Invalidated when the buffer grows.
+        """
+        return self._timestamps[:self._size]
+
+    def last(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+            Views of the last n samples and timestamps.
+        """
+        start = max(self._size - n, 0)
+        return self._samples[start:self._size], self._timestamps[start:self._size]
+
+    def clear(self):
+        self._size = 0
+
+
+class EEGRingBuffer:
+    """
+        Fixed-capacity EEG buffer keeping the most recent samples.
+
+        Every sample is written twice, at its ring position and one capacity
+        further, so the last n samples are always contiguous in memory and
+        last() can return views instead of copies. This is meant for live
+        consumers (plots, signal checks) while the EEGWriter takes care of
+        the full recording.
+
+        Views returned by last() are overwritten as new chunks arrive; copy
+        them if they have to outlive the next callback.
+
+        Object Attributes:
+        - n_channels (int): Number of EEG channels per sample.
+        - capacity (int): Number of most recent samples kept.
+        - total (int): Number of samples appended since creation.
+    """
+
+    def __init__(self, n_channels: int = 5, capacity: int = 256 * 30, dtype=np.float64):
+        self.n_channels = n_channels
+        self.capacity = capacity
+        self.total = 0
+        self._samples = np.zeros((2 * capacity, n_channels), dtype=dtype)
+        self._timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self._head = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, samples: np.ndarray, timestamps: np.ndarray):
+        """
+            Copies one chunk as delivered by the Muse callback.
+
+            Arguments:
+            - samples (np.ndarray): Array of shape (channels, n).
+            - timestamps (np.ndarray): Array of shape (n,).
+        """
+        n = len(timestamps)
+        if n > self.capacity:
+            samples = samples[:, -self.capacity:]
+            timestamps = timestamps[-self.capacity:]
+            self.total += n - self.capacity
+            n = self.capacity
+
+        first = min(n, self.capacity - self._head)
+        for offset in (0, self.capacity):
+            start = self._head + offset
+            self._samples[start:start + first] = samples[:, :first].T
+            self._timestamps[start:start + first] = timestamps[:first]
+        if first < n:
+            rest = n - first
+            for offset in (0, self.capacity):
+                self._samples[offset:offset + rest] = samples[:, first:].T
+                self._timestamps[offset:offset + rest] = timestamps[first:]
+
+        self._head = (self._head + n) % self.capacity
+        self.total += n
+
+    def last(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+            Views of the last n samples, shape (n, channels), and their timestamps.
+        """
+        n = min(n, len(self))
+        end = self._head + self.capacity
+        return self._samples[end - n:end], self._timestamps[end - n:end]
+
+    def last_seconds(self, seconds: float, sampling_rate: float = 256) -> tuple[np.ndarray, np.ndarray]:
+        """
+            Views of the samples recorded during the last given seconds.
+        """
+        return self.last(int(round(seconds * sampling_rate)))
@@ -0,0 +1,72 @@
+import tkinter as tk
+from time import perf_counter
+from tkinter import ttk
+from camera_control.eeg_buffer import EEGRingBuffer
+from camera_control.eeg_monitor import EEGMonitor, MUSE_CHANNELS
+
+class EEGDashboard(ttk.Frame):
+    """
+        Table with the live sample rate, dropped packets and channel RMS of every Muse.
+
+        Redraws are decimated to a few per second on the Tk thread. A
+        redraw only touches rows whose text changed, and when one takes
+        longer than the frame budget the interval is doubled (up to
+        max_interval) so several headsets never cost the UI its frame rate.
+
+        Object Attributes:
+        - interval (int): Milliseconds between redraws.
+        - budget (float): Seconds a redraw may take before redraws are slowed down.
+    """
+
+    COLUMNS = ("Device", "Rate (Hz)", "Dropped") + MUSE_CHANNELS
+
+    def __init__(self, parent, interval: int = 250, max_interval: int = 2000, budget: float = 0.004):
+        super().__init__(parent)
+        self.interval = interval
+        self.budget = budget
+        self._base_interval = interval
+        self._max_interval = max_interval
+        self._monitors: list[EEGMonitor] = []
+        self._rows: dict[str, tuple] = {}
+        self._after_id = None
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show='headings', height=3)
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=140 if column == "Device" else 75, anchor=tk.W if column == "Device" else tk.E)
+        self.tree.grid(row=0, column=0, sticky='ew')
+        self.columnconfigure(0, weight=1)
+
+    def add(self, device: str, buffer: EEGRingBuffer, sampling_rate: float = 256) -> EEGMonitor:
+        monitor = EEGMonitor(buffer, device, sampling_rate)
+        self._monitors.append(monitor)
+        self.tree.insert('', 'end', iid=device, values=(device,) + ("-",) * (len(self.COLUMNS) - 1))
+        self._rows[device] = None
+        if self._after_id is None:
+            self._after_id = self.after(self.interval, self._redraw)
+        return monitor
+
+    def clear(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        self._monitors = []
+        self._rows = {}
+        self.tree.delete(*self.tree.get_children())
+
+    def _redraw(self):
+        start = perf_counter()
+        for monitor in self._monitors:
+            quality = monitor.update()
+            values = (quality.device, f"{quality.rate:.0f}", str(quality.dropped)) + \
+                tuple("-" if rms != rms else f"{rms:.1f}" for rms in quality.rms)
+            if self._rows.get(quality.device) != values:
+                self.tree.item(quality.device, values=values)
+                self._rows[quality.device] = values
+
+        elapsed = perf_counter() - start
+        if elapsed > self.budget:
+            self.interval = min(self.interval * 2, self._max_interval)
+        elif self.interval > self._base_interval and elapsed < self.budget / 2:
+            self.interval = max(self.interval // 2, self._base_interval)
+        self._after_id = self.after(self.interval, self._redraw)
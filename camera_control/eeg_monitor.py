@@ -0,0 +1,120 @@
+from collections import deque
+from dataclasses import dataclass
+from time import time
+import numpy as np
+from camera_control.eeg_buffer import EEGRingBuffer
+from camera_control.eeg_timing import TimingAnalyzer
+
+MUSE_CHANNELS = ("TP9", "AF7", "AF8", "TP10", "Right AUX")
+
+@dataclass
+class SignalQuality:
+    """
+        Live signal check of one Muse.
+
+        Attributes:
+        - device (str): Muse name.
+        - rate (float): Samples per second received during the window.
+        - dropped (int): Packets lost since monitoring started.
+        - rms (np.ndarray): RMS per channel over the window with the mean removed, in microvolts.
+        - received (int): Samples received since monitoring started.
+    """
+    device: str
+    rate: float
+    dropped: int
+    rms: np.ndarray
+    received: int
+
+
+class EEGMonitor:
+    """
+        Incremental signal quality of an EEGRingBuffer.
+
+        Every update() only reads the samples appended since the previous
+        one and keeps per-update channel sums, so its cost depends on the
+        update rate, not on the window length. The window sums are kept as
+        running totals that blocks are added to and subtracted from.
+
+        A lost packet shows up as a gap in the timestamps. The new
+        timestamps are fed packet by packet to a TimingAnalyzer, so the
+        dropped packets shown live follow the same rule as the timing
+        sidecar of the recording.
+
+        Object Attributes:
+        - buffer (EEGRingBuffer): Buffer filled by the Muse callback.
+        - device (str): Muse name.
+        - sampling_rate (float): Nominal sampling rate.
+        - window (float): Seconds the rate and RMS are computed over.
+        - samples_per_packet (int): Samples per channel in one BLE packet.
+        - timing (TimingAnalyzer): Gap detector over every sample taken in.
+    """
+
+    def __init__(self, buffer: EEGRingBuffer, device: str = "", sampling_rate: float = 256,
+                 window: float = 2.0, samples_per_packet: int = 12):
+        self.buffer = buffer
+        self.device = device
+        self.sampling_rate = sampling_rate
+        self.window = window
+        self.samples_per_packet = samples_per_packet
+        self.received = 0
+        self._seen = 0
+        self._last_timestamp = -np.inf
+        self.timing = TimingAnalyzer(sampling_rate, samples_per_packet)
+        # (first timestamp, last timestamp, count, sum, sum of squares) per update.
+        self._blocks = deque()
+        self._count = 0
+        self._sum = np.zeros(buffer.n_channels)
+        self._squares = np.zeros(buffer.n_channels)
+
+    def update(self, now: float = None) -> SignalQuality:
+        """
+            Takes in the new samples and returns the current signal quality.
+
+            Arguments:
+            - now (float): Current time() seconds, the clock of the Muse timestamps.
+        """
+        now = time() if now is None else now
+
+        total = self.buffer.total
+        new = total - self._seen
+        self._seen = total
+        if new > 0:
+            # Read a few packets more in case the callback appended while we looked;
+            # samples that were already taken in are skipped by their timestamp.
+            samples, timestamps = self.buffer.last(new + 4 * self.samples_per_packet)
+            fresh = timestamps > self._last_timestamp
+            if not fresh.all():
+                samples, timestamps = samples[fresh], timestamps[fresh]
+            if len(timestamps):
+                self._add(samples, timestamps)
+
+        while self._blocks and self._blocks[0][1] < now - self.window:
+            _, _, count, block_sum, block_squares = self._blocks.popleft()
+            self._count -= count
+            self._sum -= block_sum
+            self._squares -= block_squares
+
+        if self._count:
+            mean = self._sum / self._count
+            rms = np.sqrt(np.maximum(self._squares / self._count - mean * mean, 0))
+        else:
+            rms = np.full(self.buffer.n_channels, np.nan)
+        # Blocks leave the window whole, so the rate is taken over the span they cover.
+        span = now - self._blocks[0][0] + 1 / self.sampling_rate if self._blocks else 0
+        rate = float(self._count / span) if span > 0 else 0.0
+        dropped = self.timing.missing // self.samples_per_packet
+        return SignalQuality(self.device, rate, dropped, rms, self.received)
+
+    def _add(self, samples: np.ndarray, timestamps: np.ndarray):
+        # Packet by packet, so gaps between the packets of one block are found too.
+        for start in range(0, len(timestamps), self.samples_per_packet):
+            self.timing.add(timestamps[start:start + self.samples_per_packet])
+
+        block_sum = samples.sum(axis=0)
+        block_squares = np.einsum("ij,ij->j", samples, samples)
+        self._blocks.append((float(timestamps[0]), float(timestamps[-1]), len(timestamps), block_sum, block_squares))
+        self._count += len(timestamps)
+        self._sum += block_sum
+        self._squares += block_squares
+        self.received += len(timestamps)
+        self._last_timestamp = float(timestamps[-1])
@@ -0,0 +1,239 @@
+import os
+from dataclasses import dataclass
+import numpy as np
+
+TIMING_EXTENSION = ".timing"
+
+@dataclass
+class TimingGap:
+    """
+        Samples lost between two packets.
+
+        Attributes:
+        - index (int): Row of the recording right after the gap.
+        - time (float): Timestamp of that row as recorded.
+        - missing (int): Number of samples lost, a multiple of the packet size.
+    """
+    index: int
+    time: float
+    missing: int
+
+
+class RunningFit:
+    """
+        Least squares line y = a + b x, updated one point at a time.
+
+        Uses Welford updates of the means and co-moments, so long runs of
+        large x and y keep full precision.
+    """
+
+    def __init__(self, default_slope: float = 0.0):
+        self.default_slope = default_slope
+        self.count = 0
+        self._mean_x = 0.0
+        self._mean_y = 0.0
+        self._cxx = 0.0
+        self._cxy = 0.0
+
+    def add(self, x: float, y: float):
+        self.count += 1
+        dx = x - self._mean_x
+        self._mean_x += dx / self.count
+        self._mean_y += (y - self._mean_y) / self.count
+        self._cxx += dx * (x - self._mean_x)
+        self._cxy += dx * (y - self._mean_y)
+
+    @property
+    def slope(self) -> float:
+        """
+            Fitted slope; default_slope until two different x were seen.
+        """
+        if self._cxx > 0:
+            return self._cxy / self._cxx
+        return self.default_slope
+
+    def predict(self, x):
+        return self._mean_y + self.slope * (x - self._mean_x)
+
+
+class TimingAnalyzer:
+    """
+        Streaming gap and jitter detector for Muse timestamps.
+
+        Each packet costs O(1): only its first and last timestamp are
+        looked at. BLE loses whole packets, so the jump between packets is
+        rounded to whole packets and anything from one packet up is a gap;
+        jitter of less than half a packet is not mistaken for loss. The
+        packet timestamps are regressed on the sample number, counting lost
+        samples, with a RunningFit, and the residual of every packet
+        against the fit so far gives the jitter.
+
+        The fit is the least squares line over the whole recording, so
+        dejittered() can rebuild a clean timestamp column of any length
+        without having kept the raw timestamps.
+
+        Object Attributes:
+        - sampling_rate (float): Nominal sampling rate, used to size gaps.
+        - samples_per_packet (int): Samples per channel in one BLE packet.
+        - samples (int): Samples seen.
+        - missing (int): Samples lost in gaps.
+        - gaps (list): TimingGap per gap.
+    """
+
+    def __init__(self, sampling_rate: float = 256, samples_per_packet: int = 12):
+        self.sampling_rate = sampling_rate
+        self.samples_per_packet = samples_per_packet
+        self.samples = 0
+        self.missing = 0
+        self.gaps: list[TimingGap] = []
+        self._origin = None
+        self._last = None
+        # Timestamp, relative to the first one, over sample number.
+        self._fit = RunningFit(1 / sampling_rate)
+        # Running residual statistics.
+        self._residuals = 0
+        self._residual_mean = 0.0
+        self._residual_m2 = 0.0
+        self.max_jitter = 0.0
+
+    def add(self, timestamps: np.ndarray):
+        """
+            Takes in the timestamps of one packet, as passed to the Muse callback.
+        """
+        n = len(timestamps)
+        if n == 0:
+            return
+        first = float(timestamps[0])
+        if self._origin is None:
+            self._origin = first
+        else:
+            packets = round(((first - self._last) * self.sampling_rate - 1) / self.samples_per_packet)
+            missing = max(packets, 0) * self.samples_per_packet
+            if missing > 0:
+                self.gaps.append(TimingGap(self.samples, first, missing))
+                self.missing += missing
+
+        x = float(self.samples + self.missing)
+        y = first - self._origin
+        if self._fit.count >= 2:
+            residual = y - self._fit.predict(x)
+            self._residuals += 1
+            delta = residual - self._residual_mean
+            self._residual_mean += delta / self._residuals
+            self._residual_m2 += delta * (residual - self._residual_mean)
+            self.max_jitter = max(self.max_jitter, abs(residual))
+
+        self._fit.add(x, y)
+
+        self.samples += n
+        self._last = float(timestamps[-1])
+
+    @property
+    def period(self) -> float:
+        """
+            Fitted seconds per sample; the nominal period until two packets were seen.
+        """
+        return self._fit.slope
+
+    @property
+    def rate(self) -> float:
+        return 1 / self.period
+
+    @property
+    def jitter(self) -> float:
+        """
+            Standard deviation of the packet timestamps around the fit, in seconds.
+        """
+        if self._residuals < 2:
+            return 0.0
+        return (self._residual_m2 / (self._residuals - 1)) ** 0.5
+
+    def sample_numbers(self) -> np.ndarray:
+        """
+            Sample number on the device clock of every recorded row, counting lost samples.
+        """
+        return _sample_numbers(self.samples, self.gaps)
+
+    def dejittered(self) -> np.ndarray:
+        """
+            Timestamps of every recorded row on the fitted clock.
+        """
+        if self._origin is None:
+            return np.zeros(0)
+        return self._origin + self._fit.predict(self.sample_numbers().astype(np.float64))
+
+    def summary(self) -> dict:
+        return {"samples": self.samples, "missing": self.missing, "gaps": len(self.gaps),
+                "rate": self.rate, "jitter": self.jitter, "max_jitter": self.max_jitter}
+
+
+def _lost_samples(steps: np.ndarray, sampling_rate: float, samples_per_packet: int) -> np.ndarray:
+    # Vectorized TimingAnalyzer.add(): samples between neighbouring rows, rounded to whole packets.
+    packets = np.rint((steps * sampling_rate - 1) / samples_per_packet)
+    return np.maximum(packets, 0).astype(np.int64) * samples_per_packet
+
+
+def _sample_numbers(count: int, gaps: list[TimingGap]) -> np.ndarray:
+    steps = np.zeros(count + 1, dtype=np.int64)
+    if gaps:
+        np.add.at(steps, [gap.index for gap in gaps], [gap.missing for gap in gaps])
+    return np.arange(count, dtype=np.int64) + np.cumsum(steps[:count])
+
+
+def detect_gaps(timestamps: np.ndarray, sampling_rate: float = 256, samples_per_packet: int = 12) -> list[TimingGap]:
+    """
+        Gaps of a whole recording, vectorized, e.g. for files written without a timing sidecar.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    missing = _lost_samples(np.diff(timestamps), sampling_rate, samples_per_packet)
+    rows = np.flatnonzero(missing) + 1
+    return [TimingGap(int(row), float(timestamps[row]), int(missing[row - 1])) for row in rows]
+
+
+def dejitter(timestamps: np.ndarray, sampling_rate: float = 256,
+             samples_per_packet: int = 12) -> tuple[np.ndarray, list[TimingGap]]:
+    """
+        Replaces the timestamps of a whole recording by a least squares line over its sample numbers.
+
+        Returns:
+        - timestamps (np.ndarray): Dejittered timestamps, one per row.
+        - gaps (list): TimingGap per gap.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(timestamps) < 2:
+        return timestamps.copy(), []
+    gaps = detect_gaps(timestamps, sampling_rate, samples_per_packet)
+    numbers = _sample_numbers(len(timestamps), gaps).astype(np.float64)
+    origin = timestamps[0]
+    slope, intercept = np.polyfit(numbers, timestamps - origin, 1)
+    return origin + intercept + slope * numbers, gaps
+
+
+def timing_filename(filename: str) -> str:
+    return os.path.splitext(filename)[0] + TIMING_EXTENSION
+
+
+def write_timing(filename: str, analyzer: TimingAnalyzer):
+    """
+        Writes the dejittered timestamps and the gap index next to a recording.
+
+        The sidecar is an .npz archive with "timestamps", "gaps" (rows of
+        index, time and missing samples) and the fitted "rate" and "jitter".
+    """
+    gaps = np.array([(gap.index, gap.time, gap.missing) for gap in analyzer.gaps], dtype=np.float64).reshape(-1, 3)
+    with open(filename, "wb") as file:
+        np.savez(file, timestamps=analyzer.dejittered(), gaps=gaps,
+                 rate=analyzer.rate, jitter=analyzer.jitter, max_jitter=analyzer.max_jitter)
+
+
+def read_timing(filename: str) -> tuple[np.ndarray, list[TimingGap]]:
+    """
+        Reads a timing sidecar written by write_timing().
+
+        Returns:
+        - timestamps (np.ndarray): Dejittered timestamps, one per row of the recording.
+        - gaps (list): TimingGap per gap.
+    """
+    with np.load(filename) as data:
+        gaps = [TimingGap(int(index), float(time), int(missing)) for index, time, missing in data["gaps"]]
+        return data["timestamps"], gaps
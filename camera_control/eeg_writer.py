@@ -0,0 +1,357 @@
+import os
+import queue
+from abc import ABC, abstractmethod
+import struct
+import threading
+import logging
+from time import monotonic
+import numpy as np
+from camera_control.eeg_buffer import EEGBuffer
+from camera_control.eeg_timing import TimingAnalyzer, timing_filename, write_timing
+
+EEG_CHANNELS = ['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX']
+
+class EEGWriter(ABC):
+    """
+        Streams Muse EEG chunks to disk from a background thread.
+
+        The Muse callback only puts (samples, timestamps) on a bounded queue,
+        the writer thread drains it in batches, appends them to the file and
+        fsyncs periodically. Memory use stays constant for any session length
+        and close() only has to flush what is still queued.
+
+        Subclasses implement _open(), _write_batch() and _close() for a file format
+        and set EXTENSION. Use make_writer() to pick one by format name.
+
+        Object Attributes:
+        - filename (str): Output file path.
+        - queue_size (int): Maximum number of queued chunks. When the disk falls this
+        far behind, write() blocks rather than dropping samples.
+        - fsync_interval (float): Seconds between fsync calls.
+        - timing (TimingAnalyzer): Gap and jitter detector fed by write(), if enabled.
+        close() then also writes the dejittered timestamps to timing_filename.
+    """
+
+    EXTENSION = None
+
+    def __init__(self, filename: str, queue_size: int = 1024, fsync_interval: float = 5.0, timing: bool = False):
+        self.filename = filename
+        self.queue_size = queue_size
+        self.fsync_interval = fsync_interval
+        self.samples_written = 0
+        self.timing: TimingAnalyzer = TimingAnalyzer() if timing else None
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread = None
+        self._error: Exception = None
+        self._file = None
+
+    def start(self) -> "EEGWriter":
+        directory = os.path.dirname(self.filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._open()
+        self._thread = threading.Thread(target=self._run, name=f"eeg-writer {os.path.basename(self.filename)}", daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, samples: np.ndarray, timestamps: np.ndarray):
+        """
+            Queues one chunk as delivered by the Muse callback.
+
+            Arguments:
+            - samples (np.ndarray): Array of shape (channels, n).
+            - timestamps (np.ndarray): Array of shape (n,).
+        """
+        if self._error is not None:
+            return
+        if self.timing is not None:
+            self.timing.add(timestamps)
+        self._queue.put((samples, timestamps))
+
+    def close(self):
+        """
+            Flushes the remaining chunks and closes the file.
+
+            Raises the exception of the writer thread, if it failed.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+        logging.info(f"Wrote {self.samples_written} samples to {self.filename}")
+        if self.timing is not None:
+            write_timing(self.timing_filename, self.timing)
+            logging.info(f"{self.filename}: {self.timing.missing} samples lost in {len(self.timing.gaps)} gaps, "
+                         f"{self.timing.rate:.3f} Hz, jitter {self.timing.jitter * 1000:.2f} ms")
+
+    @property
+    def timing_filename(self) -> str:
+        return timing_filename(self.filename)
+
+    def _run(self):
+        last_sync = monotonic()
+        done = False
+        try:
+            while not done:
+                try:
+                    batch = [self._queue.get(timeout=self.fsync_interval)]
+                except queue.Empty:
+                    batch = []
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    done = True
+                    batch = batch[:batch.index(None)]
+
+                if batch:
+                    samples = np.concatenate([samples for samples, _ in batch], 1).T
+                    timestamps = np.concatenate([timestamps for _, timestamps in batch])
+                    self._write_batch(samples, timestamps)
+                    self.samples_written += len(timestamps)
+
+                if done or monotonic() - last_sync >= self.fsync_interval:
+                    self._sync()
+                    last_sync = monotonic()
+        except Exception as e:
+            logging.error(f"EEG writer for {self.filename} failed: {e}")
+            self._error = e
+            # Keep draining so the Muse callback never blocks on a dead writer.
+            while not done:
+                done = self._queue.get() is None
+        finally:
+            self._close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @abstractmethod
+    def _open(self):
+        pass
+
+    @abstractmethod
+    def _write_batch(self, samples: np.ndarray, timestamps: np.ndarray):
+        pass
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CSVWriter(EEGWriter):
+    """
+        Writes the same CSV layout as DataFrame.to_csv(float_format='%.3f'):
+        an index column, one column per channel and a timestamps column.
+
+        Timestamps are rounded to milliseconds; use a binary format to keep
+        their full precision.
+    """
+
+    EXTENSION = ".csv"
+
+    def _open(self):
+        self._file = open(self.filename, "w", newline="")
+        self._file.write(",".join([""] + EEG_CHANNELS + ["timestamps"]) + "\n")
+
+    def _write_batch(self, samples: np.ndarray, timestamps: np.ndarray):
+        index = np.arange(self.samples_written, self.samples_written + len(timestamps))
+        rows = np.column_stack([index, samples, timestamps])
+        np.savetxt(self._file, rows, fmt=["%d"] + ["%.3f"] * (rows.shape[1] - 1), delimiter=",")
+
+
+class NPYWriter(EEGWriter):
+    """
+        Appends raw float64 rows (channels followed by timestamps) to a .npy file.
+
+        A fixed size header is reserved up front and rewritten with the current
+        row count on every sync, so the file can be opened at any time with
+        np.load(filename, mmap_mode='r').
+    """
+
+    EXTENSION = ".npy"
+    HEADER_SIZE = 128
+
+    def _open(self):
+        self._file = open(self.filename, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d, %d), }" % (
+            self.samples_written, len(EEG_CHANNELS) + 1)
+        preamble = b"\x93NUMPY\x01\x00" + struct.pack("<H", self.HEADER_SIZE - 10)
+        header = header.ljust(self.HEADER_SIZE - len(preamble) - 1) + "\n"
+        self._file.seek(0)
+        self._file.write(preamble + header.encode("latin1"))
+        self._file.seek(0, os.SEEK_END)
+
+    def _write_batch(self, samples: np.ndarray, timestamps: np.ndarray):
+        rows = np.column_stack([samples, timestamps]).astype("<f8", copy=False)
+        self._file.write(rows.tobytes())
+
+    def _sync(self):
+        self._write_header()
+        super()._sync()
+
+
+class _ChunkedWriter(EEGWriter):
+    """
+        Collects batches in an EEGBuffer and hands them to _write_chunk() in
+        chunks of at least rows_per_chunk samples, so columnar formats do not
+        end up with one tiny row group per BLE packet.
+    """
+
+    def __init__(self, filename: str, rows_per_chunk: int = 256 * 10, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.rows_per_chunk = rows_per_chunk
+        self._pending = EEGBuffer(len(EEG_CHANNELS), capacity=rows_per_chunk * 2)
+
+    def _write_batch(self, samples: np.ndarray, timestamps: np.ndarray):
+        self._pending.append(samples.T, timestamps)
+        if len(self._pending) >= self.rows_per_chunk:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if len(self._pending):
+            self._write_chunk(self._pending.samples, self._pending.timestamps)
+            self._pending.clear()
+
+    def _sync(self):
+        self._flush_pending()
+        super()._sync()
+
+    @abstractmethod
+    def _write_chunk(self, samples: np.ndarray, timestamps: np.ndarray):
+        pass
+
+
+class ParquetWriter(_ChunkedWriter):
+    """
+        Writes one Parquet row group per chunk with float64 columns.
+
+        Requires pyarrow.
+    """
+
+    EXTENSION = ".parquet"
+
+    def _open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow, install it with: pip install pyarrow")
+        self._pa = pa
+        self._schema = pa.schema([(name, pa.float64()) for name in EEG_CHANNELS + ["timestamps"]])
+        self._file = open(self.filename, "wb")
+        self._parquet = pq.ParquetWriter(self._file, self._schema)
+
+    def _write_chunk(self, samples: np.ndarray, timestamps: np.ndarray):
+        columns = [self._pa.array(samples[:, channel]) for channel in range(samples.shape[1])]
+        columns.append(self._pa.array(timestamps))
+        self._parquet.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+
+    def _close(self):
+        if self._file is not None:
+            self._flush_pending()
+            self._parquet.close()
+        super()._close()
+
+
+class HDF5Writer(_ChunkedWriter):
+    """
+        Appends to resizable "eeg" (n, channels) and "timestamps" (n,) float64
+        datasets. Channel names are stored in the "channels" attribute.
+
+        Requires h5py.
+    """
+
+    EXTENSION = ".h5"
+
+    def _open(self):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError("HDF5 output requires h5py, install it with: pip install h5py")
+        self._file = h5py.File(self.filename, "w")
+        self._eeg = self._file.create_dataset(
+            "eeg", shape=(0, len(EEG_CHANNELS)), maxshape=(None, len(EEG_CHANNELS)),
+            dtype="f8", chunks=(self.rows_per_chunk, len(EEG_CHANNELS)))
+        self._eeg.attrs["channels"] = EEG_CHANNELS
+        self._timestamps = self._file.create_dataset(
+            "timestamps", shape=(0,), maxshape=(None,), dtype="f8", chunks=(self.rows_per_chunk,))
+
+    def _write_chunk(self, samples: np.ndarray, timestamps: np.ndarray):
+        start = self._timestamps.shape[0]
+        end = start + len(timestamps)
+        self._eeg.resize(end, axis=0)
+        self._eeg[start:end] = samples
+        self._timestamps.resize(end, axis=0)
+        self._timestamps[start:end] = timestamps
+
+    def _sync(self):
+        # h5py files have no file descriptor to fsync, flushing is the closest we get.
+        self._flush_pending()
+        self._file.flush()
+
+    def _close(self):
+        if self._file is not None:
+            self._flush_pending()
+        super()._close()
+
+
+WRITERS = {
+    "csv": CSVWriter,
+    "npy": NPYWriter,
+    "parquet": ParquetWriter,
+    "hdf5": HDF5Writer,
+}
+
+def make_writer(filename: str, output_format: str = "csv", **kwargs) -> EEGWriter:
+    """
+        Creates a writer for the given format.
+
+        Arguments:
+        - filename (str): Output path. The extension is replaced by the format's one.
+        - output_format (str): One of "csv", "npy", "parquet" or "hdf5".
+        - kwargs: Passed to the writer, e.g. timing=True for a timing sidecar.
+
+        Returns:
+        - writer (EEGWriter): A writer that has not been started yet.
+    """
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown EEG output format {output_format!r}, expected one of {list(WRITERS)}")
+    writer_class = WRITERS[output_format]
+    filename = os.path.splitext(filename)[0] + writer_class.EXTENSION
+    return writer_class(filename, **kwargs)
+
+def read_recording(filename: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Reads a recording written by any of the writers.
+
+        Returns:
+        - samples (np.ndarray): Array of shape (n, channels).
+        - timestamps (np.ndarray): Array of shape (n,).
+    """
+    extension = os.path.splitext(filename)[1]
+    if extension == CSVWriter.EXTENSION:
+        rows = np.loadtxt(filename, delimiter=",", skiprows=1, ndmin=2)
+        return rows[:, 1:-1], rows[:, -1]
+    if extension == NPYWriter.EXTENSION:
+        rows = np.load(filename, mmap_mode="r")
+        return rows[:, :-1], rows[:, -1]
+    if extension == ParquetWriter.EXTENSION:
+        import pyarrow.parquet as pq
+        table = pq.read_table(filename)
+        samples = np.column_stack([table.column(name).to_numpy() for name in EEG_CHANNELS])
+        return samples, table.column("timestamps").to_numpy()
+    if extension == HDF5Writer.EXTENSION:
+        import h5py
+        with h5py.File(filename, "r") as file:
+            return file["eeg"][:], file["timestamps"][:]
+    raise ValueError(f"Unknown EEG recording format: {filename}")
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+
+class BackgroundLoop:
+    """
+        A long-lived asyncio event loop running on its own daemon thread.
+
+        BLE clients (bleak) are bound to the loop they were connected on, so
+        every GoProControl should be connected and commanded through the same
+        loop. Coroutines can be submitted from any thread; submitting only
+        schedules the coroutine, so there is no event loop startup cost per
+        command.
+
+        Use BackgroundLoop.shared() to get the process-wide instance.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, name: str = "background-loop"):
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    @classmethod
+    def shared(cls) -> "BackgroundLoop":
+        """
+            Returns the process-wide loop, starting it on first use.
+        """
+        with cls._shared_lock:
+            if cls._shared is None or not cls._shared.is_running():
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def is_running(self) -> bool:
+        return self._thread.is_alive() and self._loop.is_running()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+        self._loop.close()
+
+    def submit(self, coroutine) -> Future:
+        """
+            Schedules a coroutine on the loop from any thread.
+
+            Returns:
+            - future (concurrent.futures.Future): Resolves to the coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine, timeout: float = None):
+        """
+            Runs a coroutine on the loop and blocks until it finishes.
+
+            Must not be called from the loop thread itself.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from its own loop thread")
+        return self.submit(coroutine).result(timeout)
+
+    def gather(self, *coroutines, return_exceptions: bool = False) -> Future:
+        """
+            Runs several coroutines concurrently on the loop with asyncio.gather.
+
+            Useful to fire several cameras with a single scheduling step.
+        """
+        async def _gather():
+            return await asyncio.gather(*coroutines, return_exceptions=return_exceptions)
+
+        return self.submit(_gather())
+
+    def stop(self, timeout: float = 5):
+        """
+            Stops the loop and waits for its thread to exit.
+        """
+        if not self._thread.is_alive():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning("Background loop did not stop in time")
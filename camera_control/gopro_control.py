@@ -1,7 +1,12 @@
 from bleak import *
 import asyncio
 import logging
-import re
+from dataclasses import dataclass
+from time import perf_counter, time
+from camera_control.exceptions import GoProCommandException
+from camera_control.instrumentation import latency
+from camera_control.ble_discovery import BLEDiscovery, GOPRO_NAME
+from camera_control.device_registry import KnownDevice
 
 class GoProRequest:
     """
@@ -15,6 +20,25 @@ class GoProRequest:
     SHUTTER_ON = bytearray([3, 1, 1, 1])
     SHUTTER_OFF = bytearray([3, 1, 1, 0])
 
+    # Queries follow the format [Length of following message, Query Id, Status Ids...]
+    GET_SETTING_VALUES = 0x12
+    REGISTER_STATUS_UPDATES = 0x53
+    STATUS_UPDATE = 0x93
+
+class GoProStatusId:
+    ENCODING = 10
+    REMAINING_STORAGE = 54
+    BATTERY = 70
+
+    WATCHED = (ENCODING, BATTERY, REMAINING_STORAGE)
+
+class GoProSettingId:
+    FPS = 3
+
+# Nominal frame rate of each FPS setting value; the NTSC rates run 1000/1001 slow.
+GOPRO_FPS = {0: 240000 / 1001, 1: 120000 / 1001, 2: 100, 5: 60000 / 1001, 6: 50, 8: 30000 / 1001, 9: 25,
+             10: 24000 / 1001, 13: 200}
+
 class GoProUuid:
     GOPRO_UUID_BASE = "b5f9{0}-aa8d-11e3-9046-0002a5d5c51b"
     COMMAND_REQUEST = GOPRO_UUID_BASE.format("0072")
@@ -24,44 +48,251 @@ class GoProUuid:
     QUERY_REQUEST = GOPRO_UUID_BASE.format("0076")
     QUERY_RESPONSE = GOPRO_UUID_BASE.format("0077")
 
-class GoProControl:
+@dataclass
+class GoProResponse:
+    """
+        A complete response received on one of the response characteristics.
+
+        Attributes:
+        - uuid (str): Characteristic the response arrived on.
+        - request_id (int): Command or query id the response belongs to.
+        - status (int): 0 on success.
+        - payload (bytes): Response bytes after id and status.
+        - sent (float): perf_counter() the request was written, if it was requested.
+        - received (float): perf_counter() the last packet of the response arrived.
+    """
+    uuid: str
+    request_id: int
+    status: int
+    payload: bytes
+    sent: float = None
+    received: float = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 0
+
+    @property
+    def rtt(self) -> float:
+        """
+            Seconds from writing the request until the camera's response.
+        """
+        if self.sent is None or self.received is None:
+            return None
+        return self.received - self.sent
+
+    def tlv(self) -> dict[int, bytes]:
+        return parse_tlv(self.payload)
+
+def parse_tlv(data: bytes) -> dict[int, bytes]:
+    """
+        Parses [id, length, value] triplets, as used by query responses.
+    """
+    values = {}
+    index = 0
+    while index + 2 <= len(data):
+        length = data[index + 1]
+        values[data[index]] = bytes(data[index + 2:index + 2 + length])
+        index += 2 + length
+    return values
+
+@dataclass
+class GoProStatus:
+    """
+        Last known camera state, kept up to date by status push notifications.
+
+        Attributes:
+        - encoding (bool): Whether the camera is recording.
+        - battery (int): Internal battery level in percent.
+        - remaining_storage (int): Free space on the SD card in kilobytes.
+        - updated (float): time() of the last update.
+    """
+    encoding: bool = None
+    battery: int = None
+    remaining_storage: int = None
+    updated: float = None
+
+    def update(self, values: dict[int, bytes]):
+        for status_id, value in values.items():
+            number = int.from_bytes(value, "big")
+            if status_id == GoProStatusId.ENCODING:
+                self.encoding = bool(number)
+            elif status_id == GoProStatusId.BATTERY:
+                self.battery = number
+            elif status_id == GoProStatusId.REMAINING_STORAGE:
+                self.remaining_storage = number
+        self.updated = time()
+
+class GoProPacketAssembler:
+    """
+        Joins the BLE packets of one response characteristic into messages.
+
+        Every message starts with a header holding its length: 5 bits in a
+        general header, 13 or 16 bits in an extended header. Messages longer
+        than a packet continue in packets whose first byte has the top bit set.
+    """
+
+    CONTINUATION = 0x80
+
     def __init__(self):
+        self._message = bytearray()
+        self._remaining = 0
+
+    def feed(self, packet: bytes) -> bytes:
+        """
+            Adds one notification. Returns the complete message, or None while it is incomplete.
+        """
+        header = packet[0]
+        if header & self.CONTINUATION:
+            if not self._remaining:
+                logging.warning("Ignoring GoPro continuation packet without a start packet")
+                return None
+            body = packet[1:]
+        else:
+            header_type = (header >> 5) & 0x3
+            if header_type == 0:
+                length, body = header & 0x1F, packet[1:]
+            elif header_type == 1:
+                length, body = ((header & 0x1F) << 8) | packet[1], packet[2:]
+            elif header_type == 2:
+                length, body = (packet[1] << 8) | packet[2], packet[3:]
+            else:
+                logging.warning(f"Ignoring GoPro packet with reserved header {header:#04x}")
+                return None
+            self._message = bytearray()
+            self._remaining = length
+
+        body = body[:self._remaining]
+        self._message += body
+        self._remaining -= len(body)
+        if self._remaining:
+            return None
+        return bytes(self._message)
+
+class GoProControl:
+    def __init__(self, ack_timeout: float = 5):
         self._device: BleakClient = None
         self._name: str = None
         self._event: asyncio.Event = asyncio.Event()
+        self.ack_timeout = ack_timeout
+        self._assemblers: dict[str, GoProPacketAssembler] = {}
+        self._pending: dict[tuple[str, int], asyncio.Future] = {}
+        self._status = GoProStatus()
 
     @staticmethod
-    async def search_device() -> dict[str, BLEDevice]:
-        devices: dict[str, BLEDevice] = {}
+    async def search_device(count: int = None, timeout: float = 10) -> dict[str, BLEDevice]:
+        """
+            Finds GoPros through the shared BLE discovery.
 
-        token = re.compile(r"GoPro [A-Z0-9]{4}")
+            Arguments:
+            - count (int): Number of GoPros wanted; the scan stops once they are seen.
+            None scans for the whole timeout.
+            - timeout (float): Maximum scan time in seconds.
+        """
+        return await BLEDiscovery.shared().find(GOPRO_NAME, count, timeout)
 
-        logging.info(f"Discovering.")
-        for device in await BleakScanner.discover(timeout=10):
-            if device.name and token.match(device.name):
-                logging.info(f"Found device: {device.name}")
-                devices[device.name] = device
-        
-        return devices
+    async def connect(self, device: BLEDevice | KnownDevice) -> None:
+        """
+            Connects to a scanned device, or by address to a KnownDevice from
+            the device registry. If the known address does not work anymore,
+            the GoPro is found by scanning again.
+        """
+        if isinstance(device, KnownDevice):
+            if await self._connect(device.address, device.name):
+                BLEDiscovery.shared().remember(device.name, device.address)
+                return
+            device = await BLEDiscovery.shared().rescan(device.name)
+            if device is None:
+                logging.warning(f"Could not find the device again.")
+                return
+        await self._connect(device, device.name)
 
-    async def connect(self, device: BLEDevice) -> None:
+    async def _connect(self, device: BLEDevice | str, name: str) -> bool:
         self._device = BleakClient(device)
 
-        logging.info(f"Trying to connect to: {device.name}")
+        logging.info(f"Trying to connect to: {name}")
         try: 
             await self._device.connect(timeout=15)
-        except TimeoutError:
-            logging.warning(f"Could not connect to the device: {device.name}")
+        except (TimeoutError, BleakError):
+            logging.warning(f"Could not connect to the device: {name}")
+            return False
 
         try:
-            logging.info(f"Pairing with: {device.name}")
+            logging.info(f"Pairing with: {name}")
             await self._device.pair()
         except NotImplementedError:
             pass
 
         if self._device.is_connected:
             logging.info(f"Device succesfully connected. Address: {self._device.address}")
-            self._name = device.name
+            self._name = name
+            await self._device.start_notify(GoProUuid.COMMAND_RESPONSE, self._notification_handler)
+            await self._device.start_notify(GoProUuid.QUERY_RESPONSE, self._notification_handler)
+            await self.register_status_updates()
+        return self._device.is_connected
+
+    async def register_status_updates(self):
+        """
+            Asks the camera to push encoding, battery and storage whenever they change.
+
+            The first response carries the current values, so status is filled
+            right after connecting.
+        """
+        request = bytearray([1 + len(GoProStatusId.WATCHED), GoProRequest.REGISTER_STATUS_UPDATES, *GoProStatusId.WATCHED])
+        try:
+            await self._request(GoProUuid.QUERY_REQUEST, GoProUuid.QUERY_RESPONSE, request)
+        except (TimeoutError, GoProCommandException, BleakError) as e:
+            logging.warning(f"Could not register for status updates of {self._name}: {e}")
+
+    async def get_fps(self) -> float:
+        """
+            Nominal frame rate of the current video setting, None if the camera did not tell.
+        """
+        request = bytearray([2, GoProRequest.GET_SETTING_VALUES, GoProSettingId.FPS])
+        try:
+            response = await self._request(GoProUuid.QUERY_REQUEST, GoProUuid.QUERY_RESPONSE, request)
+        except (TimeoutError, GoProCommandException, BleakError) as e:
+            logging.warning(f"Could not read the frame rate of {self._name}: {e}")
+            return None
+        value = response.tlv().get(GoProSettingId.FPS)
+        return GOPRO_FPS.get(int.from_bytes(value, "big")) if value else None
+
+    @property
+    def name(self) -> str:
+        """
+            BLE name of the connected GoPro, None while not connected.
+        """
+        return self._name
+
+    @property
+    def status(self) -> GoProStatus:
+        """
+            Snapshot of the last pushed camera state. Costs no BLE round trip.
+        """
+        return GoProStatus(**vars(self._status))
+
+    def _notification_handler(self, characteristic: BleakGATTCharacteristic, data: bytearray):
+        received = perf_counter()
+        uuid = characteristic.uuid
+        assembler = self._assemblers.setdefault(uuid, GoProPacketAssembler())
+        message = assembler.feed(data)
+        if message is None or len(message) < 2:
+            return
+        response = GoProResponse(uuid, message[0], message[1], message[2:], received=received)
+        self._on_response(response)
+
+    def _on_response(self, response: GoProResponse):
+        if response.uuid == GoProUuid.QUERY_RESPONSE and response.ok and response.request_id in (
+                GoProRequest.REGISTER_STATUS_UPDATES, GoProRequest.STATUS_UPDATE):
+            self._status.update(response.tlv())
+            if response.request_id == GoProRequest.STATUS_UPDATE:
+                return
+
+        future = self._pending.pop((response.uuid, response.request_id), None)
+        if future is None:
+            logging.debug(f"Unsolicited GoPro response {response.request_id:#04x} from {self._name}")
+        elif not future.done():
+            future.set_result(response)
 
     async def disconnect(self) -> None:
         if self._device != None:
@@ -69,15 +300,50 @@ class GoProControl:
             if await self._device.disconnect():
                 self._device = None
                 self._name = None
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._assemblers.clear()
+        self._status = GoProStatus()
+
+    async def _request(self, request_uuid: str, response_uuid: str, request: bytearray) -> GoProResponse:
+        """
+            Writes a request and waits for the camera's response to it.
+
+            Raises TimeoutError when no response arrives within ack_timeout and
+            GoProCommandException when the camera rejects the request.
+        """
+        key = (response_uuid, request[1])
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            sent = perf_counter()
+            await self._device.write_gatt_char(request_uuid, request, response=True)
+            response = await asyncio.wait_for(future, self.ack_timeout)
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        response.sent = sent
+        if not response.ok:
+            raise GoProCommandException(response.request_id, response.status)
+        return response
+
+    async def _send_command_request(self, request: GoProRequest) -> GoProResponse:
+        return await self._request(GoProUuid.COMMAND_REQUEST, GoProUuid.COMMAND_RESPONSE, request)
 
-    async def _send_command_request(self, request: GoProRequest):
-        request_uuid = GoProUuid.COMMAND_REQUEST
-        await self._device.write_gatt_char(request_uuid, request, response=True)
+    async def start_shutter(self) -> GoProResponse:
+        """
+            Starts recording and returns once the camera acknowledged it.
 
-    async def start_shutter(self):
+            The round trip until the acknowledgement is recorded as latency.
+        """
         logging.info(f"Starting shutter for: {self._device.address}")
-        await self._send_command_request(GoProRequest.SHUTTER_ON)
+        response = await self._send_command_request(GoProRequest.SHUTTER_ON)
+        latency.record(self._name or self._device.address, "start_shutter", response.sent, response.received)
+        return response
 
-    async def stop_shutter(self):
+    async def stop_shutter(self) -> GoProResponse:
         logging.info(f"Stopping shutter for: {self._device.address}")
-        await self._send_command_request(GoProRequest.SHUTTER_OFF)
\ No newline at end of file
+        response = await self._send_command_request(GoProRequest.SHUTTER_OFF)
+        latency.record(self._name or self._device.address, "stop_shutter", response.sent, response.received)
+        return response
\ No newline at end of file
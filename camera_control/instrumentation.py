@@ -0,0 +1,102 @@
+import json
+import threading
+from contextlib import contextmanager
+from time import perf_counter, time
+import numpy as np
+
+class LatencyHistogram:
+    """
+        Send/ack latencies of one operation on one device.
+
+        Keeps every (send, ack) pair, since a session only has a handful of
+        triggers, and bins the latencies on log-spaced edges from 0.1 ms to 10 s.
+    """
+
+    EDGES = np.logspace(-4, 1, 51)
+
+    def __init__(self):
+        self.sends: list[float] = []
+        self.acks: list[float] = []
+
+    def add(self, send: float, ack: float):
+        self.sends.append(send)
+        self.acks.append(ack)
+
+    @property
+    def latencies(self) -> np.ndarray:
+        return np.subtract(self.acks, self.sends)
+
+    def summary(self) -> dict:
+        latencies = self.latencies
+        if len(latencies) == 0:
+            return {"count": 0}
+        counts, _ = np.histogram(latencies, self.EDGES)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "count": len(latencies),
+            "mean": float(latencies.mean()),
+            "min": float(latencies.min()),
+            "max": float(latencies.max()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "histogram": {"edges": self.EDGES.tolist(), "counts": counts.tolist()},
+            "sends": self.sends,
+            "acks": self.acks,
+        }
+
+
+class LatencyRecorder:
+    """
+        Collects per-device trigger latencies measured with perf_counter.
+
+        Control classes wrap their start/stop commands in measure(), the
+        orchestrator dumps everything as JSON at the end of a session.
+        Latencies are in seconds.
+    """
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        # Lets readers convert the monotonic send/ack times to time() seconds.
+        self.wall_reference = (time(), perf_counter())
+
+    def record(self, device: str, operation: str, send: float, ack: float):
+        with self._lock:
+            histogram = self._histograms.get((device, operation))
+            if histogram is None:
+                histogram = self._histograms[(device, operation)] = LatencyHistogram()
+            histogram.add(send, ack)
+
+    @contextmanager
+    def measure(self, device: str, operation: str):
+        """
+            Records the time spent in the with block. Failed calls are not recorded.
+        """
+        send = perf_counter()
+        yield
+        self.record(device, operation, send, perf_counter())
+
+    def summary(self) -> dict:
+        """
+            Returns {device: {operation: statistics}}.
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+        summary = {}
+        for (device, operation), histogram in histograms:
+            summary.setdefault(device, {})[operation] = histogram.summary()
+        return summary
+
+    def dump_json(self, filename: str):
+        with open(filename, "w") as file:
+            json.dump({"wall_reference": self.wall_reference, "devices": self.summary()}, file, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+        self.wall_reference = (time(), perf_counter())
+
+
+# Shared by every control class of the process.
+latency = LatencyRecorder()
@@ -0,0 +1,116 @@
+import itertools
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from camera_control.exceptions import CameraException
+from camera_control.async_http import AsyncHTTPConnection
+
+class JSONRPCTransport:
+    """
+        JSON-RPC transport for the Sony Remote Control API.
+
+        Keeps a persistent keep-alive connection to the camera endpoint,
+        numbers requests with an auto-incrementing id and decodes every
+        response the same way. Requests without parameters (e.g.
+        startMovieRec) are serialized once and only have their id appended
+        afterwards, so the hot recording commands cost almost no CPU.
+
+        Object Attributes:
+        - url (str): Camera endpoint the requests are posted to.
+        - timeout: Timeout passed to requests, in seconds.
+    """
+
+    def __init__(self, url: str = None, timeout=(3.05, 10), pool_size: int = 2):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._ids = itertools.count(1)
+        self._static_payloads: dict[tuple[str, str], bytes] = {}
+
+    def close(self):
+        self.session.close()
+
+    def encode(self, method: str, params: list = None, version: str = "1.0") -> bytes:
+        """
+            Serializes a request with the next id.
+        """
+        request_id = next(self._ids)
+        if params:
+            return json.dumps({"method": method, "params": params, "id": request_id, "version": version}).encode()
+
+        key = (method, version)
+        prefix = self._static_payloads.get(key)
+        if prefix is None:
+            prefix = json.dumps({"method": method, "params": [], "version": version})[:-1].encode() + b', "id": '
+            self._static_payloads[key] = prefix
+        return prefix + str(request_id).encode() + b"}"
+
+    def call(self, method: str, params: list = None, version: str = "1.0", timeout=None) -> dict:
+        """
+            Posts a request to the camera and returns the decoded response.
+
+            Arguments:
+            - method (str): API method name, e.g. "startMovieRec".
+            - params (list): API parameters, empty by default.
+            - version (str): API version of the method.
+            - timeout: Overrides the transport timeout for this call.
+
+            Returns:
+            - json_response (dict): Response from the camera upon the request
+        """
+        response = self.session.post(self.url, data=self.encode(method, params, version),
+                                     timeout=timeout or self.timeout)
+        return self.decode(response)
+
+    @staticmethod
+    def decode(response) -> dict:
+        """
+            Decodes a camera response and raises CameraException on API errors.
+        """
+        json_response = response.json()
+        check_for_errors(json_response)
+        return json_response
+
+class AsyncJSONRPCTransport(JSONRPCTransport):
+    """
+        asyncio flavour of JSONRPCTransport.
+
+        call() is a coroutine that posts over a persistent AsyncHTTPConnection,
+        so many cameras can be driven from one event loop with asyncio.gather.
+    """
+
+    def __init__(self, url: str = None, timeout: float = 10):
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._static_payloads: dict[tuple[str, str], bytes] = {}
+        self._connection: AsyncHTTPConnection = None
+        self.url = url
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    @url.setter
+    def url(self, url: str):
+        self._url = url
+        self._path = urlsplit(url).path if url else None
+        self._connection = AsyncHTTPConnection.from_url(url, self.timeout) if url else None
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+
+    async def call(self, method: str, params: list = None, version: str = "1.0", timeout=None) -> dict:
+        response = await self._connection.post(self._path, self.encode(method, params, version), timeout=timeout)
+        return self.decode(response)
+
+def check_for_errors(json_response: dict):
+    """
+        Raises errors according to the error code of the given JSON response.
+
+        If there is no error code, it raises nothing.
+    """
+    if "error" in json_response:
+        raise CameraException(int(json_response["error"][0]))
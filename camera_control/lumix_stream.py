@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import queue
+import socket
+import threading
+from dataclasses import dataclass
+from time import perf_counter
+from camera_control.frame_log import FrameLog
+
+JPEG_START = b"\xff\xd8"
+
+@dataclass
+class LumixFrame:
+    """
+        One preview frame of the Lumix UDP stream.
+
+        data points into a buffer of the receiver's pool; hand the frame
+        back with LumixStreamReceiver.release() when done with it.
+
+        Attributes:
+        - counter (int): Number of the frame since the receiver started.
+        - received (float): perf_counter() the datagram arrived.
+        - data (memoryview): JPEG image.
+    """
+    counter: int
+    received: float
+    data: memoryview
+    _buffer: bytearray = None
+
+
+class LumixStreamReceiver:
+    """
+        Receives the UDP preview stream a Lumix sends after start_stream().
+
+        Every datagram carries one JPEG after a camera specific header. A
+        receiver thread reads datagrams with recv_into() straight into a
+        fixed pool of preallocated buffers and only locates the JPEG start,
+        so receiving allocates nothing per frame. When the consumer holds
+        on to frames and the pool runs dry, the oldest unread frame is
+        dropped and its buffer reused.
+
+        The camera stops streaming when it does not hear from the client for
+        a while, so start_stream() is repeated every keepalive_interval.
+        With an AsyncLumixControl the commands are coroutines; they are run
+        on the control's event loop, passed as loop.
+
+        Object Attributes:
+        - port (int): Local UDP port the camera streams to.
+        - frames (int): Frames received.
+        - dropped (int): Frames dropped because no buffer was free.
+        - frame_log (FrameLog): Logs the arrival of every frame, dropped or not.
+    """
+
+    def __init__(self, control, port: int = 49199, pool_size: int = 4, max_datagram: int = 65536,
+                 keepalive_interval: float = 5, loop: asyncio.AbstractEventLoop = None):
+        self.control = control
+        self.loop = loop
+        self.port = port
+        self.keepalive_interval = keepalive_interval
+        self.frames = 0
+        self.dropped = 0
+        self.frame_log: FrameLog = None
+        self._free: queue.Queue[bytearray] = queue.Queue()
+        for _ in range(pool_size):
+            self._free.put(bytearray(max_datagram))
+        self._ready: queue.Queue[LumixFrame] = queue.Queue()
+        self._socket: socket.socket = None
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> "LumixStreamReceiver":
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self._socket.bind(("", self.port))
+        self._socket.settimeout(0.5)
+        self.port = self._socket.getsockname()[1]
+        self._stopped.clear()
+        self._threads = [threading.Thread(target=self._receive, name="lumix-stream", daemon=True),
+                         threading.Thread(target=self._keep_alive, name="lumix-keepalive", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = 1):
+        """
+            Stops receiving and tells the camera to stop streaming.
+
+            Called from a coroutine on the control's own loop, the threads
+            can be waiting on that loop for a keep-alive command, so joining
+            them there would block it. Then the threads are joined in a
+            worker thread and the returned task finishes the stop; it may be
+            awaited but does not have to be.
+
+            Returns:
+            - asyncio.Task: The pending stop when called on the control's loop, else None.
+        """
+        self._stopped.set()
+        if self._on_loop():
+            return self.loop.create_task(self._stop_on_loop(timeout))
+        self._shut_down(timeout)
+        try:
+            self._command(self.control.stop_stream)
+        except Exception as e:
+            logging.warning(f"Could not stop the Lumix stream: {e}")
+
+    async def _stop_on_loop(self, timeout: float):
+        await asyncio.to_thread(self._shut_down, timeout)
+        try:
+            await self.control.stop_stream()
+        except Exception as e:
+            logging.warning(f"Could not stop the Lumix stream: {e}")
+
+    def _shut_down(self, timeout: float):
+        for thread in self._threads:
+            thread.join(timeout)
+        if self._socket is not None:
+            self._socket.close()
+        self.stop_frame_log()
+
+    def start_frame_log(self, filename: str, source: str = None) -> FrameLog:
+        """
+            Starts logging frame arrivals, e.g. for the duration of a recording.
+        """
+        self.stop_frame_log()
+        self.frame_log = FrameLog(filename, source or f"Lumix {self.control.cam_ip}")
+        return self.frame_log
+
+    def stop_frame_log(self):
+        frame_log, self.frame_log = self.frame_log, None
+        if frame_log is not None:
+            frame_log.close()
+
+    def _keep_alive(self):
+        while True:
+            try:
+                self._command(self.control.start_stream, self.port)
+            except Exception as e:
+                logging.warning(f"Lumix stream keep-alive failed: {e}")
+            if self._stopped.wait(self.keepalive_interval):
+                return
+
+    def _command(self, command, *args):
+        result = command(*args)
+        if not asyncio.iscoroutine(result):
+            return result
+        if self._on_loop():
+            # Called on the control's own loop: must not block it.
+            return self.loop.create_task(result)
+        return asyncio.run_coroutine_threadsafe(result, self.loop).result(self.keepalive_interval)
+
+    def _on_loop(self) -> bool:
+        try:
+            return self.loop is not None and asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _take_buffer(self) -> bytearray:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            frame = self._ready.get_nowait()
+            self.dropped += 1
+            return frame._buffer
+        except queue.Empty:
+            pass
+        # Every buffer is held by the consumer, wait for one to come back.
+        while not self._stopped.is_set():
+            try:
+                return self._free.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return None
+
+    def _receive(self):
+        buffer = self._take_buffer()
+        while buffer is not None and not self._stopped.is_set():
+            try:
+                size = self._socket.recv_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if not self._stopped.is_set():
+                    logging.warning(f"Lumix stream receiver stopped: {e}")
+                return
+            received = perf_counter()
+            start = buffer.find(JPEG_START, 0, size)
+            if start < 0:
+                continue
+            self.frames += 1
+            frame_log = self.frame_log
+            if frame_log is not None:
+                # The stream has no frame counter of its own, so losses are unknown.
+                frame_log.record(received)
+            self._ready.put(LumixFrame(self.frames, received, memoryview(buffer)[start:size], buffer))
+            buffer = self._take_buffer()
+            if buffer is None:
+                return
+
+    def get(self, timeout: float = None) -> LumixFrame:
+        """
+            Oldest unread frame; raises queue.Empty when none arrives within the timeout.
+        """
+        return self._ready.get(timeout=timeout)
+
+    def release(self, frame: LumixFrame):
+        """
+            Returns the frame's buffer to the pool. The frame data must not be used afterwards.
+        """
+        if frame._buffer is not None:
+            self._free.put(frame._buffer)
+            frame._buffer = None
+
+    def __iter__(self):
+        """
+            Yields frames until stopped, releasing each one when the next is requested.
+        """
+        frame = None
+        try:
+            while not self._stopped.is_set():
+                try:
+                    next_frame = self._ready.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if frame is not None:
+                    self.release(frame)
+                frame = next_frame
+                yield frame
+        finally:
+            if frame is not None:
+                self.release(frame)
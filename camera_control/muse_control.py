@@ -1,21 +1,24 @@
 from time import *
 import os
 from muselsl.muse import Muse
-from muselsl.record import find_muse
 import logging
 import muselsl.backends as backends
-import numpy as np
 import pandas as pd
+from camera_control.eeg_buffer import EEGBuffer
+from camera_control.eeg_writer import EEG_CHANNELS
+from camera_control.instrumentation import latency
+from camera_control.event_loop import BackgroundLoop
+from camera_control.ble_discovery import BLEDiscovery, muse_name
 
 def connect_muse(address, filename = None, backend = "auto", name = None):
     if not address:
-        found_muse = find_muse(name, backend)
+        found_muse = BackgroundLoop.shared().run(BLEDiscovery.shared().find(muse_name(name), 1))
         if not found_muse:
             print('Muse could not be found')
             return
         else:
-            address = found_muse['address']
-            name = found_muse['name']
+            name, device = next(iter(found_muse.items()))
+            address = device.address
         print('Connecting to %s : %s...' % (name if name else 'Muse', address))
 
     if not filename:
@@ -23,22 +26,18 @@ def connect_muse(address, filename = None, backend = "auto", name = None):
             os.getcwd(),
             ("recording_%s.csv" % strftime("%Y-%m-%d-%H.%M.%S", gmtime())))
 
-    eeg_samples = []
-    timestamps = []
+    buffer = EEGBuffer()
 
-    def save_eeg(new_samples, new_timestamps):
-        eeg_samples.append(new_samples)
-        timestamps.append(new_timestamps)
-
-    muse = Muse(address, save_eeg, backend=backend)
+    muse = Muse(address, buffer.append, backend=backend)
 
     muse.connect()
 
     logging.info(f"Connected to Muse device {name}.")
-    return muse
+    return muse, buffer, filename
 
-def start_recording(muse: Muse, duration):
-    muse.start()
+def start_recording(muse: Muse, buffer: EEGBuffer, filename, duration):
+    with latency.measure(f"Muse {muse.address}", "start"):
+        muse.start()
 
     t_init = time()
     print('Start recording at time t=%.3f' % t_init)
@@ -52,12 +51,9 @@ def start_recording(muse: Muse, duration):
     muse.stop()
     muse.disconnect()
 
-    timestamps = np.concatenate(timestamps)
-    eeg_samples = np.concatenate(eeg_samples, 1).T
-    recording = pd.DataFrame(
-    data=eeg_samples, columns=['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX'])
+    recording = pd.DataFrame(data=buffer.samples, columns=EEG_CHANNELS)
 
-    recording['timestamps'] = timestamps
+    recording['timestamps'] = buffer.timestamps
 
     directory = os.path.dirname(filename)
     if not os.path.exists(directory):
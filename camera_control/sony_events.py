@@ -0,0 +1,137 @@
+import logging
+import threading
+from dataclasses import dataclass, field, replace
+from time import time, sleep
+import requests
+from camera_control.exceptions import CameraException, CameraJSONErrorCodes
+from camera_control.json_rpc import JSONRPCTransport
+
+@dataclass
+class SonyCameraState:
+    """
+        Camera state as last reported by getEvent.
+
+        Attributes:
+        - camera_status (str): e.g. "IDLE", "MovieRecording", "NotReady".
+        - shoot_mode (str): e.g. "still", "movie".
+        - available_apis (list): API methods the camera accepts right now.
+        - updated (float): time() of the last event.
+    """
+    camera_status: str = None
+    shoot_mode: str = None
+    available_apis: list[str] = field(default_factory=list)
+    updated: float = None
+
+    def update(self, result: list):
+        """
+            Applies a getEvent result. Entries the camera left empty keep their last value.
+        """
+        for entry in result:
+            # Most entries are objects, some (e.g. storageInformation) are lists of objects.
+            for item in entry if isinstance(entry, list) else [entry]:
+                if not isinstance(item, dict):
+                    continue
+                kind = item.get("type")
+                if kind == "cameraStatus":
+                    self.camera_status = item["cameraStatus"]
+                elif kind == "shootMode":
+                    self.shoot_mode = item["currentShootMode"]
+                elif kind == "availableApiList":
+                    self.available_apis = list(item["names"])
+        self.updated = time()
+
+
+class SonyEventWatcher:
+    """
+        Follows the camera state with getEvent long polling.
+
+        A daemon thread asks for the full state once, then keeps a
+        getEvent(true) request open that the camera only answers when
+        something changed. Reads of the state are local and cost no request.
+
+        The watcher uses its own transport, so a long poll never blocks the
+        connection the recording commands are sent on.
+
+        Object Attributes:
+        - camera_url (str): Camera endpoint.
+        - version (str): getEvent API version, newer cameras also accept "1.2" and "1.3".
+        - poll_timeout (float): Seconds a long poll may stay open before it is renewed.
+    """
+
+    def __init__(self, camera_url: str, version: str = "1.0", poll_timeout: float = 60):
+        self.camera_url = camera_url
+        self.version = version
+        self.poll_timeout = poll_timeout
+        self._transport = JSONRPCTransport(camera_url, timeout=(3.05, poll_timeout), pool_size=1)
+        self._state = SonyCameraState()
+        self._changed = threading.Condition()
+        self._running = False
+        self._thread: threading.Thread = None
+
+    @property
+    def state(self) -> SonyCameraState:
+        """
+            Copy of the last known camera state.
+        """
+        with self._changed:
+            return replace(self._state, available_apis=list(self._state.available_apis))
+
+    def start(self) -> "SonyEventWatcher":
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sony-events", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1):
+        """
+            Stops watching. A long poll in flight is abandoned, not awaited.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._transport.close()
+
+    def wait_for(self, predicate, timeout: float = None) -> bool:
+        """
+            Blocks until predicate(state) is true or the timeout passes.
+
+            Returns:
+            - result (bool): Whether the predicate became true.
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: predicate(self._state), timeout)
+
+    def wait_for_status(self, camera_status: str, timeout: float = None) -> bool:
+        """
+            Blocks until the camera reports the given cameraStatus, e.g. "MovieRecording".
+        """
+        return self.wait_for(lambda state: state.camera_status == camera_status, timeout)
+
+    def _run(self):
+        long_poll = False
+        while self._running:
+            try:
+                response = self._transport.call("getEvent", [long_poll], self.version)
+            except requests.Timeout:
+                # No change within poll_timeout, open a new long poll.
+                continue
+            except CameraException as e:
+                if e.error_code == CameraJSONErrorCodes.ERROR_POLLING_ALREADY_RUNNING:
+                    # A previous long poll (e.g. of an earlier watcher) is still open on the camera.
+                    long_poll = False
+                    sleep(0.5)
+                else:
+                    logging.warning(f"getEvent failed on {self.camera_url}: {e}")
+                    sleep(1)
+                continue
+            except (requests.RequestException, ValueError) as e:
+                logging.warning(f"getEvent failed on {self.camera_url}: {e}")
+                sleep(1)
+                continue
+
+            with self._changed:
+                self._state.update(response.get("result", []))
+                self._changed.notify_all()
+            long_poll = True
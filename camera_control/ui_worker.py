@@ -0,0 +1,94 @@
+import logging
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class UIWorker:
+    """
+        Runs blocking device calls off the Tk thread.
+
+        Jobs run one after another on a single worker thread, so a start
+        clicked while devices still connect runs right after the connect.
+        Results come back through a queue that the Tk thread polls with
+        root.after() while jobs are pending; callbacks therefore run on the
+        Tk thread and may update widgets and show message boxes. The event
+        loop never waits on a device.
+
+        Object Attributes:
+        - root: Tk root window the callbacks are scheduled on.
+        - interval (int): Milliseconds between polls of the result queue.
+    """
+
+    def __init__(self, root, interval: int = 16, name: str = "ui-worker"):
+        self.root = root
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._results = queue.SimpleQueue()
+        self._pending = 0
+        self._poll_id = None
+
+    @property
+    def busy(self) -> bool:
+        return self._pending > 0
+
+    def submit(self, function, *args, on_done=None, on_error=None, **kwargs) -> Future:
+        """
+            Runs function(*args, **kwargs) on the worker thread.
+
+            Must be called from the Tk thread.
+
+            Arguments:
+            - on_done: Called on the Tk thread with the result.
+            - on_error: Called on the Tk thread with the exception. Errors
+            without a handler are logged.
+
+            Returns:
+            - future (concurrent.futures.Future): Resolves to the result.
+        """
+        future = self._executor.submit(function, *args, **kwargs)
+        self._pending += 1
+        future.add_done_callback(lambda done: self._results.put((self._finish, (done, on_done, on_error))))
+        self._schedule()
+        return future
+
+    def call_in_ui(self, callback, *args):
+        """
+            Calls callback(*args) on the Tk thread, e.g. to report progress from a job.
+
+            Safe to call from any thread; delivered while a job is pending.
+        """
+        self._results.put((callback, args))
+
+    def _finish(self, future: Future, on_done, on_error):
+        self._pending -= 1
+        error = future.exception()
+        if error is None:
+            if on_done is not None:
+                on_done(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            logging.error("Background job failed", exc_info=error)
+
+    def _schedule(self):
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.interval, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                callback, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                logging.exception("UI callback failed")
+        if self._pending or not self._results.empty():
+            self._schedule()
+
+    def shutdown(self, wait: bool = False):
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -2,3 +2,6 @@ from .android_wifi_connection import SocketConnection
 from .lumix_connection import LumixConnection
 from .gopro_connection import GoProConnection
 from .muse_connection import MuseConnection
+from .trigger import TriggerEngine, TriggerReport, TriggerResult
+from .clock_sync import ClockOffsetEstimator, ClockEstimate
+from .connector import connect_all, ConnectResult
@@ -1,40 +1,150 @@
 import socket
+import logging
+from time import time_ns
 from .connection import Connection
+from .camera_control import latency
+from .clock_sync import (ClockOffsetEstimator, START_RECORDING, STOP_RECORDING, SYNC_REQUEST,
+                         TIME_FORMAT, SYNC_RESPONSE_FORMAT)
 
 class SocketConnection(Connection):
-    def __init__(self, ip, port):
+    CONNECT_TIMEOUT = 5
+
+    def __init__(self, ip, port, sync_clock=False, sync_rounds=16, sync_timeout=1.0):
+        """
+        sync_clock enables the time synchronization protocol of clock_sync.py.
+        Leave it off for recorder apps that only understand the start and stop bytes.
+        """
         self.ip = ip
         self.port = port
         self.socket = None
+        self.sync_clock = sync_clock
+        self.sync_rounds = sync_rounds
+        self.sync_timeout = sync_timeout
+        self.clock = ClockOffsetEstimator()
+        self.phone_start_time = None
+
+    def __str__(self):
+        return f"Android {self.ip}:{self.port}"
 
     def connect(self):
         """Establish a connection to the server."""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Single byte commands must not wait for Nagle's algorithm.
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.socket.connect((self.ip, self.port))
             print(f"Connected to {self.ip}:{self.port}")
         except socket.error as e:
             print(f"Error connecting to {self.ip}:{self.port} - {e}")
+            self.socket.close()
+            self.socket = None
+            return None
+        if self.sync_clock:
+            self.synchronize_clock()
         return self
 
+    def disconnect(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
     def _send_byte(self, byte):
         """Send a single byte to the server."""
         try:
-            self.socket.sendall(byte)
+            with latency.measure(str(self), "send_byte " + byte.hex()):
+                self.socket.sendall(byte)
             print(f"Sent byte: {byte}")
         except socket.error as e:
             print(f"Error sending byte: {e}")
 
+    def _recv_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Connection closed by the phone")
+            data += chunk
+        return bytes(data)
+
+    def synchronize_clock(self):
+        """Run one burst of time sync exchanges and return the updated ClockEstimate.
+
+        Call it more than once per session (it runs at connect and before
+        stopping) so the estimate can account for clock drift.
+        """
+        self.clock.new_burst()
+        timeout = self.socket.gettimeout()
+        self.socket.settimeout(self.sync_timeout)
+        try:
+            for _ in range(self.sync_rounds):
+                t0 = time_ns()
+                self.socket.sendall(SYNC_REQUEST + TIME_FORMAT.pack(t0))
+                response = None
+                while response is None:
+                    # A start time reported too late for _receive_start_time() may come first.
+                    response = self._receive_message()
+                t3 = time_ns()
+                echoed, t1, t2 = response
+                if echoed != t0:
+                    raise ValueError("Sync response does not match the request")
+                self.clock.add(t0, t1, t2, t3)
+        except (socket.error, ValueError, ConnectionError) as e:
+            logging.warning(f"Clock synchronization with {self} failed: {e}")
+        finally:
+            self.socket.settimeout(timeout)
+
+        estimate = self.clock.estimate()
+        if estimate is not None:
+            logging.info(f"{self} clock offset {estimate.offset / 1e6:.3f} ms, "
+                         f"drift {estimate.drift * 1e6:.2f} ppm, min RTT {estimate.rtt / 1e6:.3f} ms")
+        return estimate
+
+    def _receive_message(self):
+        """Read one message from the phone by its leading byte.
+
+        A start time report is stored in phone_start_time and None is returned;
+        a sync response is returned as its (t0, t1, t2) tuple.
+        """
+        command = self._recv_exact(1)
+        if command == START_RECORDING:
+            self.phone_start_time = TIME_FORMAT.unpack(self._recv_exact(TIME_FORMAT.size))[0]
+            return None
+        if command == SYNC_REQUEST:
+            return SYNC_RESPONSE_FORMAT.unpack(self._recv_exact(SYNC_RESPONSE_FORMAT.size))
+        raise ValueError(f"Unexpected message from the phone: {command!r}")
+
+    def _receive_start_time(self):
+        timeout = self.socket.gettimeout()
+        self.socket.settimeout(self.sync_timeout)
+        try:
+            # If the reply comes after the timeout, the next sync burst picks it up.
+            self._receive_message()
+        except (socket.error, ValueError, ConnectionError) as e:
+            logging.warning(f"{self} did not report its recording start time: {e}")
+        finally:
+            self.socket.settimeout(timeout)
+
+    def host_start_time(self):
+        """Time the phone started recording, in host time.time_ns(), if known."""
+        estimate = self.clock.estimate()
+        if self.phone_start_time is None or estimate is None:
+            return None
+        return estimate.to_host(self.phone_start_time)
+
     def start_recording(self):
-        self._send_byte(b'\1')
+        self._send_byte(START_RECORDING)
+        if self.sync_clock:
+            self._receive_start_time()
         return self
 
     def stop_recording(self):
-        self._send_byte(b'\0')
+        if self.sync_clock:
+            self.synchronize_clock()
+        self._send_byte(STOP_RECORDING)
         try:
             if self.socket:
                 self.socket.close()
                 print("Connection closed")
         except socket.error as e:
             print(f"Error closing the connection: {e}")
-        return self
\ No newline at end of file
+        return self
@@ -1,3 +1,17 @@
-from camera_control.sony_control import SonyControl
-from camera_control.lumix_control import LumixControl
-from camera_control.gopro_control import GoProControl
\ No newline at end of file
+from camera_control.sony_control import SonyControl, AsyncSonyControl
+from camera_control.sony_events import SonyEventWatcher, SonyCameraState
+from camera_control.sony_liveview import LiveviewReader, LiveviewFrame, iter_frames
+from camera_control.lumix_control import LumixControl, AsyncLumixControl
+from camera_control.lumix_stream import LumixStreamReceiver, LumixFrame
+from camera_control.gopro_control import GoProControl, GoProStatus
+from camera_control.event_loop import BackgroundLoop
+from camera_control.ui_worker import UIWorker
+from camera_control.device_registry import DeviceRegistry, KnownDevice
+from camera_control.ble_discovery import BLEDiscovery, GOPRO_NAME, MUSE_NAME, muse_name
+from camera_control.instrumentation import latency, LatencyRecorder
+from camera_control.eeg_writer import EEGWriter, CSVWriter, NPYWriter, ParquetWriter, HDF5Writer, make_writer, read_recording
+from camera_control.eeg_buffer import EEGBuffer, EEGRingBuffer
+from camera_control.eeg_timing import TimingAnalyzer, TimingGap, dejitter, detect_gaps, read_timing, timing_filename
+from camera_control.muse_recorder import MuseRecorder, MuseStream, decode_eeg_packet
+from camera_control.eeg_monitor import EEGMonitor, SignalQuality, MUSE_CHANNELS
+from camera_control.frame_log import FrameLog, FrameLogReader
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from urllib.parse import urlsplit, urlencode
+
+class AsyncHTTPResponse:
+    """
+        Minimal response object with the parts of requests.Response the
+        control classes use.
+    """
+
+    def __init__(self, status: int, reason: str, headers: dict[str, str], content: bytes):
+        self.status_code = status
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncHTTPConnection:
+    """
+        A single persistent HTTP/1.1 connection built on asyncio streams.
+
+        Cameras serve one client at a time over a weak access point, so a
+        keep-alive connection per camera is all we need; requests on the same
+        connection are serialized with a lock. A stale keep-alive connection
+        is reopened once, as long as nothing of the response was received.
+
+        Object Attributes:
+        - host (str): Camera host name or IP.
+        - port (int): Camera HTTP port.
+        - timeout (float): Seconds allowed for a whole request.
+    """
+
+    def __init__(self, host: str, port: int = 80, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader = None
+        self._writer: asyncio.StreamWriter = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 10) -> "AsyncHTTPConnection":
+        parts = urlsplit(url)
+        return cls(parts.hostname, parts.port or 80, timeout)
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def open(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._writer = None
+            self._reader = None
+
+    def _abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+    async def get(self, path: str, params: dict = None, timeout: float = None) -> AsyncHTTPResponse:
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        return await self.request("GET", path, timeout=timeout)
+
+    async def post(self, path: str, body: bytes, content_type: str = "application/json",
+                   timeout: float = None) -> AsyncHTTPResponse:
+        return await self.request("POST", path, body, {"Content-Type": content_type}, timeout)
+
+    async def request(self, method: str, path: str, body: bytes = None, headers: dict = None,
+                      timeout: float = None) -> AsyncHTTPResponse:
+        async with self._lock:
+            return await asyncio.wait_for(self._request(method, path, body, headers), timeout or self.timeout)
+
+    async def _request(self, method, path, body, headers):
+        reused = self.is_open
+        if not reused:
+            await self.open()
+
+        lines = [f"{method} {path or '/'} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        message = ("\r\n".join(lines) + "\r\n\r\n").encode("latin1") + (body or b"")
+
+        try:
+            self._writer.write(message)
+            await self._writer.drain()
+            status_line = await self._reader.readline()
+            if not status_line:
+                raise ConnectionResetError("Connection closed by camera")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+            # The camera dropped the idle keep-alive connection, try once on a fresh one.
+            return await self._request(method, path, body, headers)
+        except BaseException:
+            self._abort()
+            raise
+
+        try:
+            return await self._read_response(status_line)
+        except BaseException:
+            # Timed out or failed half way through, the connection state is unknown.
+            self._abort()
+            raise
+
+    async def _read_response(self, status_line: bytes) -> AsyncHTTPResponse:
+        _, status, *reason = status_line.decode("latin1").strip().split(" ", 2)
+
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await self._reader.read()
+            await self.close()
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+
+        return AsyncHTTPResponse(int(status), reason[0] if reason else "", headers, content)
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from time import time
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".muse_camera_devices.json")
+
+@dataclass
+class KnownDevice:
+    """
+        A BLE device taken from the registry instead of a scan.
+
+        Has the name and address attributes of a BLEDevice; connect to it by
+        address. If that fails, the device has to be found by scanning again.
+    """
+    name: str
+    address: str
+
+
+class DeviceRegistry:
+    """
+        Persisted addresses of the devices of the rig.
+
+        Maps a device name to its kind ("ble", "sony" or "lumix"), its
+        address (BLE address, Sony camera URL or Lumix IP) and the time it
+        was last seen. Control classes look devices up here before scanning
+        and only scan when a known address no longer works.
+
+        The file is rewritten atomically on every change, so a crash never
+        leaves a half written registry behind.
+
+        Use DeviceRegistry.shared() to get the process-wide instance. The
+        MUSE_CAMERA_DEVICES environment variable overrides its path.
+
+        Object Attributes:
+        - path (str): JSON file the registry is stored in.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._devices: dict[str, dict] = {}
+        self.load()
+
+    @classmethod
+    def shared(cls) -> "DeviceRegistry":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(os.environ.get("MUSE_CAMERA_DEVICES", DEFAULT_REGISTRY_PATH))
+            return cls._shared
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                devices = json.load(file)
+        except FileNotFoundError:
+            devices = {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable device registry {self.path}: {e}")
+            devices = {}
+        with self._lock:
+            self._devices = devices
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._devices, indent=2, sort_keys=True)
+        temporary = self.path + ".tmp"
+        try:
+            with open(temporary, "w") as file:
+                file.write(data)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save device registry {self.path}: {e}")
+
+    def address(self, name: str, kind: str) -> str:
+        """
+            Known address of the device, or None.
+        """
+        with self._lock:
+            entry = self._devices.get(name)
+        if entry is None or entry["kind"] != kind:
+            return None
+        return entry["address"]
+
+    def find(self, kind: str, pattern: re.Pattern = None) -> dict[str, str]:
+        """
+            Known devices of a kind whose name matches the pattern, most recently seen first.
+
+            Returns:
+            - devices (dict): Device name to address.
+        """
+        with self._lock:
+            entries = sorted(self._devices.items(), key=lambda item: item[1]["last_seen"], reverse=True)
+        return {name: entry["address"] for name, entry in entries
+                if entry["kind"] == kind and (pattern is None or pattern.match(name))}
+
+    def remember(self, name: str, kind: str, address: str, save: bool = True):
+        """
+            Stores the address of a device and marks it as seen now.
+        """
+        with self._lock:
+            self._devices[name] = {"kind": kind, "address": address, "last_seen": time()}
+        if save:
+            self.save()
+
+    def forget(self, name: str):
+        with self._lock:
+            removed = self._devices.pop(name, None)
+        if removed is not None:
+            self.save()
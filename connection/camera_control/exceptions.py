@@ -47,3 +47,12 @@ class CameraNotFoundException(Exception):
     """
     def __init__(self):
         super().__init__("Could not find camera via UPNP")
+
+class GoProCommandException(Exception):
+    """
+        Raised when a GoPro answers a BLE request with an error status.
+    """
+    def __init__(self, request_id, status):
+        self.request_id = request_id
+        self.status = status
+        super().__init__(f"GoPro rejected request {request_id:#04x} with status {status}")
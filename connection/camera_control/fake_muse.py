@@ -0,0 +1,112 @@
+import asyncio
+import random
+import numpy as np
+from camera_control.muse_recorder import (MUSE_CONTROL_UUID, MUSE_EEG_UUIDS, MUSE_SAMPLING_RATE, MUSE_SCALE,
+                                          PRESET_CHANNELS, SAMPLES_PER_PACKET)
+
+# Order a Muse 2 sends the channels of one packet in.
+SEND_ORDER = (4, 1, 2, 0, 3)
+
+def encode_eeg_packet(counter: int, samples: np.ndarray) -> bytearray:
+    """
+        Inverse of decode_eeg_packet(): 12 samples in microvolts to a 20 byte notification.
+    """
+    raw = np.clip(np.rint(samples / MUSE_SCALE) + 2048, 0, 4095).astype(np.int32).reshape(6, 2)
+    packed = np.empty((6, 3), dtype=np.uint8)
+    packed[:, 0] = raw[:, 0] >> 4
+    packed[:, 1] = ((raw[:, 0] & 0x0F) << 4) | (raw[:, 1] >> 8)
+    packed[:, 2] = raw[:, 1] & 0xFF
+    return bytearray([(counter >> 8) & 0xFF, counter & 0xFF]) + packed.tobytes()
+
+
+class _Characteristic:
+    def __init__(self, uuid: str):
+        self.uuid = uuid
+
+
+class FakeMuseClient:
+    """
+        Stands in for a BleakClient connected to a Muse.
+
+        After the "d" command it sends one notification per EEG channel
+        every 12 samples at 256 Hz from a task on the running loop, paced
+        against loop time so it does not drift. Every channel carries a
+        sine of the client's frequency, so recordings show which headset
+        they came from. Preset commands switch Right AUX on or off.
+
+        Object Attributes:
+        - address (str): Address the client was created for.
+        - frequency (float): Sine frequency in Hz.
+        - amplitude (float): Sine amplitude in microvolts.
+        - drop_rate (float): Probability that a packet is lost.
+        - channels (tuple): EEG channels sent, in send order.
+        - sent (int): Packets sent.
+        - dropped (int): Packets lost on purpose.
+    """
+
+    def __init__(self, address: str, frequency: float = 10, amplitude: float = 100, drop_rate: float = 0.0,
+                 seed: int = None):
+        self.address = address
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.drop_rate = drop_rate
+        self.sent = 0
+        self.dropped = 0
+        self.commands: list[str] = []
+        self.channels = SEND_ORDER
+        self._random = random.Random(seed)
+        self._connected = False
+        self._callbacks = {}
+        self._task: asyncio.Task = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self, timeout: float = 15):
+        self._connected = True
+
+    async def disconnect(self):
+        self._stop()
+        self._connected = False
+        return True
+
+    async def start_notify(self, uuid: str, callback):
+        self._callbacks[uuid] = callback
+
+    async def write_gatt_char(self, uuid: str, data: bytearray, response: bool = False):
+        if uuid != MUSE_CONTROL_UUID:
+            raise ValueError(f"Unexpected write to {uuid}")
+        command = bytes(data[1:data[0]]).decode("ascii")
+        self.commands.append(command)
+        if command == "d" and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._stream())
+        elif command == "h":
+            self._stop()
+        elif command in PRESET_CHANNELS:
+            self.channels = tuple(channel for channel in SEND_ORDER if channel < PRESET_CHANNELS[command])
+
+    def _stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _stream(self):
+        loop = asyncio.get_running_loop()
+        period = SAMPLES_PER_PACKET / MUSE_SAMPLING_RATE
+        start = loop.time()
+        counter = 0
+        while True:
+            sample = counter * SAMPLES_PER_PACKET + np.arange(SAMPLES_PER_PACKET)
+            samples = self.amplitude * np.sin(2 * np.pi * self.frequency * sample / MUSE_SAMPLING_RATE)
+            await asyncio.sleep(max(0.0, start + (counter + 1) * period - loop.time()))
+            if self._random.random() < self.drop_rate:
+                self.dropped += 1
+            else:
+                data = encode_eeg_packet(counter % 65536, samples)
+                for channel in self.channels:
+                    callback = self._callbacks.get(MUSE_EEG_UUIDS[channel])
+                    if callback is not None:
+                        callback(_Characteristic(MUSE_EEG_UUIDS[channel]), data)
+                self.sent += 1
+            counter += 1
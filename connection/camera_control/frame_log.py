@@ -0,0 +1,139 @@
+"""
+    Binary log of video frame arrivals.
+
+    The file starts with a header holding the source name and a pair of
+    reference times taken back to back, time.time_ns() and
+    time.perf_counter_ns(), followed by fixed size little endian records:
+
+    - host_ns (int64): perf_counter_ns() the frame arrived.
+    - camera_time (int64): Camera timestamp in ms, -1 if the source has none.
+    - counter (uint32): Camera frame or sequence number, NO_COUNTER if the source has none.
+
+    Arrival times can be converted to the wall clock the EEG timestamps use,
+    so video frames can be aligned to EEG samples frame by frame.
+"""
+import struct
+import threading
+from time import perf_counter_ns, time_ns
+import numpy as np
+
+MAGIC = b"FRAMELOG"
+VERSION = 1
+HEADER = struct.Struct("<8sHqqH")
+NO_COUNTER = 0xFFFFFFFF
+FRAME_RECORD = np.dtype([("host_ns", "<i8"), ("camera_time", "<i8"), ("counter", "<u4")])
+
+class FrameLog:
+    """
+        Writes a frame arrival log.
+
+        Records are collected in a preallocated array and written in blocks,
+        so logging a frame costs one array assignment on the reader thread.
+
+        Object Attributes:
+        - filename (str): Log file.
+        - source (str): Name of the video source, e.g. "Sony" or "Lumix 192.168.54.1".
+        - frames (int): Frames logged so far.
+    """
+
+    def __init__(self, filename: str, source: str, block_size: int = 256):
+        self.filename = filename
+        self.source = source
+        self.frames = 0
+        self._records = np.zeros(block_size, dtype=FRAME_RECORD)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._file = open(filename, "wb")
+        name = source.encode("utf-8")
+        self.wall_reference, self.monotonic_reference = time_ns(), perf_counter_ns()
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.wall_reference, self.monotonic_reference, len(name)) + name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, received: float, counter: int = NO_COUNTER, camera_time: int = -1):
+        """
+            Logs one frame.
+
+            Arguments:
+            - received (float): perf_counter() the frame arrived.
+            - counter (int): Camera frame or sequence number, NO_COUNTER if the camera sends none.
+            - camera_time (int): Camera timestamp in ms, -1 if unknown.
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._records[self._count] = (int(received * 1e9), camera_time, counter)
+            self._count += 1
+            self.frames += 1
+            if self._count == len(self._records):
+                self._flush()
+
+    def _flush(self):
+        self._file.write(self._records[:self._count].tobytes())
+        self._count = 0
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush()
+            self._file.close()
+            self._file = None
+
+
+class FrameLogReader:
+    """
+        Reads a log written by FrameLog.
+
+        Object Attributes:
+        - source (str): Name of the video source.
+        - wall_reference (int): time_ns() when the log was opened.
+        - monotonic_reference (int): perf_counter_ns() at the same moment.
+        - records (np.ndarray): Structured array with host_ns, camera_time and counter.
+    """
+
+    def __init__(self, filename: str):
+        with open(filename, "rb") as file:
+            data = file.read()
+        magic, version, self.wall_reference, self.monotonic_reference, name_size = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a frame log")
+        offset = HEADER.size + name_size
+        self.source = data[HEADER.size:offset].decode("utf-8")
+        # A log cut short by a crash may end in a partial record.
+        count = (len(data) - offset) // FRAME_RECORD.itemsize
+        self.records = np.frombuffer(data, dtype=FRAME_RECORD, count=count, offset=offset)
+
+    def __len__(self):
+        return len(self.records)
+
+    def wall_clock(self) -> np.ndarray:
+        """
+            Frame arrival times in time.time() seconds, the clock of the EEG timestamps.
+        """
+        return (self.wall_reference + (self.records["host_ns"] - self.monotonic_reference)) / 1e9
+
+    def dropped(self) -> int:
+        """
+            Frames missing from the counter sequence, allowing for 16 bit wrap around.
+
+            Returns None for sources without a camera side counter, whose
+            losses cannot be told from the log.
+        """
+        counters = self.records["counter"].astype(np.int64)
+        if np.any(counters == NO_COUNTER):
+            return None
+        if len(counters) < 2:
+            return 0
+        steps = np.diff(counters) % (1 << 16)
+        return int(np.sum(np.maximum(steps - 1, 0)))
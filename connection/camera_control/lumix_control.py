@@ -1,78 +1,28 @@
+import asyncio
+import re
 import requests as r
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from camera_control.async_http import AsyncHTTPConnection
+from camera_control.instrumentation import latency
+from camera_control.lumix_stream import LumixStreamReceiver
 
-class LumixControl:
-	def __init__(self, cam_ip):
-		self.cam_ip = cam_ip
-		self.baseurl = "http://{ip}/cam.cgi".format(ip=self.cam_ip)
-		self.start_camera_control()
-
-	def start_camera_control(self):
-		resp = r.get(self.baseurl, params = {"mode": "camcmd", "value": "recmode"})
-		if self.check_response(resp):
-			print ("Connected")
-
-	def start_stream(self, upd_port):
-		resp = r.get(self.baseurl, params = {"mode": "startstream", "value": str(upd_port)})
-		if self.check_response(resp):
-			return True
-
-	def stop_stream(self):
-		resp = r.get(self.baseurl, params = {"mode": "stopstream"})
-		if self.check_response(resp):
-			return True
-
-	def get_info(self, setting):
-		params = {"mode": "getinfo", "type": setting}
-		resp = r.get(self.baseurl, params = params )
-		return resp
-
-	def current_menu_info(self):
-		resp = self.get_info("curmenu")
-		return resp
-
-	def all_menu_info(self):
-		resp = self.get_info("allmenu")
-		return resp
+# Frame rate in a videoquality value, e.g. "mp4ed_30p_100mbps_4k".
+VIDEO_QUALITY_RATE = re.compile(r'videoquality="[^"]*?(\d+)p')
 
-	def get_lens_info(self):
-		# ?, max_fstop, min_fstop, max_shutter, min_shutter, ?, ?, max_zoom, min_zoom, ?, ?, ?
-		resp = self.get_info("lens")
-		return resp
-
-	def get_setting(self, setting):
-		params = {"mode": "getsetting", "type": setting}
-		resp = r.get(self.baseurl, params = params )
-		return resp
-
-	def get_focus_mode(self):
-		resp = self.get_setting("focusmode")
-		return resp
-
-	def get_focus_mag(self):
-		resp = self.get_setting("mf_asst_mag")
-		return resp
-
-	def get_mf_asst_setting(self):
-		resp = self.get_setting("mf_asst")
-		return resp
-
-	def set_setting(self, settings):
-		params = {"mode": "setsetting"}
-		params.update(settings)
-		resp = r.get(self.baseurl, params = params )
-		return resp
-
-	def set_iso(self, ISO):
-		if ISO == "auto":
-			ISO = "50"
-		resp = self.set_setting({"type": "iso", "value": ISO})
-		if self.check_response(resp):
-			print ("ISO set to " + ISO)
+def video_quality_fps(resp):
+	# Nominal frame rate of a getsetting videoquality response, None if it has none.
+	# 24p, 30p and 60p are the NTSC rates 23.976, 29.97 and 59.94; 25p and 50p are exact.
+	match = VIDEO_QUALITY_RATE.search(resp.text)
+	if match is None:
+		return None
+	rate = int(match.group(1))
+	return rate if rate % 25 == 0 else rate * 1000 / 1001
 
-	def set_focal(self, focal):
-		# 256 between full stops. The rest are third stops.
-		# See http://c710720.r20.cf2.rackcdn.com/wp-content/uploads/2011/08/ISO-Shutter-Speeds-Fstops-Copyright-2009-2011-photographyuncapped.gif
-		fstop = {
+class LumixControl:
+	# 256 between full stops. The rest are third stops.
+	# See http://c710720.r20.cf2.rackcdn.com/wp-content/uploads/2011/08/ISO-Shutter-Speeds-Fstops-Copyright-2009-2011-photographyuncapped.gif
+	FSTOPS = {
 		"1": "0/256",
 		"1.1": "85/256",
 		"1.2": "171/256",
@@ -101,15 +51,11 @@ class LumixControl:
 		"18": "2133/256",
 		"20": "2219/256",
 		"22": "2304/256"
-		}
-		resp = self.set_setting({"type": "focal", "value": fstop[focal] })
-		if self.check_response(resp):
-			print ("F Stop set to " + focal)
+	}
 
-	def set_shutter(self, shutter):
-		# 256 between full stops. 1 second is the pos/neg boundary
-		# See http://c710720.r20.cf2.rackcdn.com/wp-content/uploads/2011/08/ISO-Shutter-Speeds-Fstops-Copyright-2009-2011-photographyuncapped.gif
-		shutter_speed = {
+	# 256 between full stops. 1 second is the pos/neg boundary
+	# See http://c710720.r20.cf2.rackcdn.com/wp-content/uploads/2011/08/ISO-Shutter-Speeds-Fstops-Copyright-2009-2011-photographyuncapped.gif
+	SHUTTER_SPEEDS = {
 		"4000": "3072/256",
 		"3200": "2987/256",
 		"2500": "2902/256",
@@ -166,11 +112,117 @@ class LumixControl:
 		"50s": "-1536/256",
 		"60s": "16384/256",
 		"B": "256/256"	
-		}
-		resp = self.set_setting({"type": "shtrspeed", "value": shutter_speed[shutter] })
+	}
+
+	def __init__(self, cam_ip, pool_size=2, timeout=(3.05, 5), retries=2):
+		# All commands go through one keep-alive session, so they reuse an
+		# already open socket instead of connecting to the camera every time.
+		# Only connection errors are retried: a request that reached the
+		# camera (e.g. video_recstart) must not be sent twice.
+		self.cam_ip = cam_ip
+		self.baseurl = "http://{ip}/cam.cgi".format(ip=self.cam_ip)
+		self.timeout = timeout
+		self.session = r.Session()
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+			max_retries=Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=0.1))
+		self.session.mount("http://", adapter)
+		self.start_camera_control()
+
+	def _get(self, params):
+		return self.session.get(self.baseurl, params = params, timeout = self.timeout)
+
+	def close(self):
+		self.session.close()
+
+	def start_camera_control(self):
+		# Also opens the pooled connection that the record commands reuse.
+		resp = self._get({"mode": "camcmd", "value": "recmode"})
+		if self.check_response(resp):
+			print ("Connected")
+
+	def warm_up(self):
+		# Cheap request that (re)opens the pooled socket, e.g. right before
+		# a record trigger after the connection has been idle.
+		resp = self._get({"mode": "getstate"})
+		return resp.ok
+
+	def start_stream(self, upd_port):
+		resp = self._get({"mode": "startstream", "value": str(upd_port)})
+		if self.check_response(resp):
+			return True
+
+	def stop_stream(self):
+		resp = self._get({"mode": "stopstream"})
+		if self.check_response(resp):
+			return True
+
+	def open_stream(self, udp_port=49199, pool_size=4):
+		# Starts the UDP preview stream and a receiver that keeps it alive.
+		# Call stop() on the receiver to end the stream.
+		return LumixStreamReceiver(self, udp_port, pool_size).start()
+
+	def get_info(self, setting):
+		params = {"mode": "getinfo", "type": setting}
+		resp = self._get(params)
+		return resp
+
+	def current_menu_info(self):
+		resp = self.get_info("curmenu")
+		return resp
+
+	def all_menu_info(self):
+		resp = self.get_info("allmenu")
+		return resp
+
+	def get_lens_info(self):
+		# ?, max_fstop, min_fstop, max_shutter, min_shutter, ?, ?, max_zoom, min_zoom, ?, ?, ?
+		resp = self.get_info("lens")
+		return resp
+
+	def get_setting(self, setting):
+		params = {"mode": "getsetting", "type": setting}
+		resp = self._get(params)
+		return resp
+
+	def get_focus_mode(self):
+		resp = self.get_setting("focusmode")
+		return resp
+
+	def get_focus_mag(self):
+		resp = self.get_setting("mf_asst_mag")
+		return resp
+
+	def get_mf_asst_setting(self):
+		resp = self.get_setting("mf_asst")
+		return resp
+
+	def set_setting(self, settings):
+		params = {"mode": "setsetting"}
+		params.update(settings)
+		resp = self._get(params)
+		return resp
+
+	def set_iso(self, ISO):
+		if ISO == "auto":
+			ISO = "50"
+		resp = self.set_setting({"type": "iso", "value": ISO})
+		if self.check_response(resp):
+			print ("ISO set to " + ISO)
+
+	def set_focal(self, focal):
+		resp = self.set_setting({"type": "focal", "value": self.FSTOPS[focal] })
+		if self.check_response(resp):
+			print ("F Stop set to " + focal)
+
+	def set_shutter(self, shutter):
+		resp = self.set_setting({"type": "shtrspeed", "value": self.SHUTTER_SPEEDS[shutter] })
 		if self.check_response(resp):
 			print ("Shutter set to " + shutter)
 
+	def get_video_quality(self):
+		resp = self.get_setting("videoquality")
+		return resp
+
 	def set_video_quality(self, quality="mp4ed_30p_100mbps_4k"):
 		# mp4_24p_100mbps_4k / mp4_30p_100mbps_4k
 		resp = self.set_setting({"type": "videoquality", "value": quality})
@@ -181,7 +233,7 @@ class LumixControl:
 	def focus_control(self, direction="tele", speed="normal"):
 		#tele or wide for direction, normal or fast for speed
 		params = {"mode": "camctrl", "type": "focus", "value": "{0}-{1}".format(direction, speed)}
-		resp = r.get(self.baseurl, params = params )
+		resp = self._get(params)
 		return resp
 
 	def rack_focus(self, start_point="current", end_point="0", speed="normal"):
@@ -231,17 +283,19 @@ class LumixControl:
 
 	def capture_photo(self):
 		params = {"mode": "camcmd", "value": "capture"}
-		resp = r.get(self.baseurl, params = params)
+		resp = self._get(params)
 		return resp
 
 	def video_record_start(self):
 		params = {"mode": "camcmd", "value": "video_recstart"}
-		resp = r.get(self.baseurl, params = params)
+		with latency.measure("Lumix " + self.cam_ip, "video_record_start"):
+			resp = self._get(params)
 		return resp
 
 	def video_record_stop(self):
 		params = {"mode": "camcmd", "value": "video_recstop"}
-		resp = r.get(self.baseurl, params = params)
+		with latency.measure("Lumix " + self.cam_ip, "video_record_stop"):
+			resp = self._get(params)
 		return resp
 
 	def check_response(self, resp):
@@ -252,6 +306,160 @@ class LumixControl:
 			print (resp.text)
 			return False
 
+class AsyncLumixControl(LumixControl):
+	# Same commands as LumixControl, as coroutines over one persistent
+	# asyncio connection. Unlike LumixControl, the constructor does not talk
+	# to the camera: await start_camera_control() once the loop is running.
+	def __init__(self, cam_ip, timeout=5):
+		self.cam_ip = cam_ip
+		self.baseurl = "http://{ip}/cam.cgi".format(ip=self.cam_ip)
+		self.timeout = timeout
+		self.connection = AsyncHTTPConnection.from_url(self.baseurl, timeout)
+
+	async def _get(self, params):
+		return await self.connection.get("/cam.cgi", params)
+
+	async def close(self):
+		await self.connection.close()
+
+	async def start_camera_control(self):
+		resp = await self._get({"mode": "camcmd", "value": "recmode"})
+		if self.check_response(resp):
+			print ("Connected")
+
+	async def warm_up(self):
+		resp = await self._get({"mode": "getstate"})
+		return resp.ok
+
+	async def start_stream(self, upd_port):
+		resp = await self._get({"mode": "startstream", "value": str(upd_port)})
+		if self.check_response(resp):
+			return True
+
+	async def stop_stream(self):
+		resp = await self._get({"mode": "stopstream"})
+		if self.check_response(resp):
+			return True
+
+	async def open_stream(self, udp_port=49199, pool_size=4):
+		# The receiver runs on its own threads; its keep-alive sends
+		# start_stream through this loop.
+		return LumixStreamReceiver(self, udp_port, pool_size, loop=asyncio.get_running_loop()).start()
+
+	async def get_info(self, setting):
+		params = {"mode": "getinfo", "type": setting}
+		return await self._get(params)
+
+	async def current_menu_info(self):
+		return await self.get_info("curmenu")
+
+	async def all_menu_info(self):
+		return await self.get_info("allmenu")
+
+	async def get_lens_info(self):
+		return await self.get_info("lens")
+
+	async def get_setting(self, setting):
+		params = {"mode": "getsetting", "type": setting}
+		return await self._get(params)
+
+	async def get_focus_mode(self):
+		return await self.get_setting("focusmode")
+
+	async def get_focus_mag(self):
+		return await self.get_setting("mf_asst_mag")
+
+	async def get_mf_asst_setting(self):
+		return await self.get_setting("mf_asst")
+
+	async def set_setting(self, settings):
+		params = {"mode": "setsetting"}
+		params.update(settings)
+		return await self._get(params)
+
+	async def set_iso(self, ISO):
+		if ISO == "auto":
+			ISO = "50"
+		resp = await self.set_setting({"type": "iso", "value": ISO})
+		if self.check_response(resp):
+			print ("ISO set to " + ISO)
+
+	async def set_focal(self, focal):
+		resp = await self.set_setting({"type": "focal", "value": self.FSTOPS[focal] })
+		if self.check_response(resp):
+			print ("F Stop set to " + focal)
+
+	async def set_shutter(self, shutter):
+		resp = await self.set_setting({"type": "shtrspeed", "value": self.SHUTTER_SPEEDS[shutter] })
+		if self.check_response(resp):
+			print ("Shutter set to " + shutter)
+
+	async def get_video_quality(self):
+		return await self.get_setting("videoquality")
+
+	async def set_video_quality(self, quality="mp4ed_30p_100mbps_4k"):
+		resp = await self.set_setting({"type": "videoquality", "value": quality})
+		if self.check_response(resp):
+			print ("Video quality set to " + quality)
+		return resp
+
+	async def focus_control(self, direction="tele", speed="normal"):
+		params = {"mode": "camctrl", "type": "focus", "value": "{0}-{1}".format(direction, speed)}
+		return await self._get(params)
+
+	async def _focus_position(self, direction, speed):
+		resp = await self.focus_control(direction, speed)
+		return int(resp.text.split(',')[1])
+
+	async def rack_focus(self, start_point="current", end_point="0", speed="normal"):
+		# See LumixControl.rack_focus
+		current_position = await self._focus_position("tele", "normal")
+
+		if end_point == "current":
+			end_point = current_position + 13
+
+		if start_point == "current":
+			start_point = current_position + 13
+		elif int(start_point) < current_position:
+			while current_position - int(start_point) > 13:
+				current_position = await self._focus_position("tele", "fast")
+		else:
+			while int(start_point) - current_position > 13:
+				current_position = await self._focus_position("wide", "fast")
+
+		start_point = int(start_point)
+
+		threshold = 13
+		if speed == "fast":
+			threshold = 70
+
+		if start_point > int(end_point):
+			while current_position - int(end_point) > threshold:
+				current_position = await self._focus_position("tele", speed)
+				if current_position - int(end_point) <= threshold:
+					threshold = 13
+					speed = "normal"
+		else:
+			while int(end_point) - current_position > threshold:
+				current_position = await self._focus_position("wide", speed)
+				if int(end_point) - current_position <= threshold:
+					threshold = 13
+					speed = "normal"
+
+	async def capture_photo(self):
+		params = {"mode": "camcmd", "value": "capture"}
+		return await self._get(params)
+
+	async def video_record_start(self):
+		params = {"mode": "camcmd", "value": "video_recstart"}
+		with latency.measure("Lumix " + self.cam_ip, "video_record_start"):
+			return await self._get(params)
+
+	async def video_record_stop(self):
+		params = {"mode": "camcmd", "value": "video_recstop"}
+		with latency.measure("Lumix " + self.cam_ip, "video_record_stop"):
+			return await self._get(params)
+
 if __name__ == "__main__":
 	IP = "10.0.1.105"
 	control = LumixControl(IP) #IP of camera
\ No newline at end of file
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import os
+from functools import partial
+from time import time, strftime, gmtime
+import numpy as np
+from bleak import BleakClient, BleakError
+from camera_control.ble_discovery import BLEDiscovery, muse_name
+from camera_control.device_registry import KnownDevice
+from camera_control.eeg_buffer import EEGRingBuffer
+from camera_control.eeg_timing import RunningFit
+from camera_control.eeg_writer import EEGWriter, make_writer
+from camera_control.event_loop import BackgroundLoop
+from camera_control.instrumentation import latency
+
+MUSE_UUID_BASE = "273e{0}-4c4d-454d-96be-f03bac821358"
+MUSE_CONTROL_UUID = MUSE_UUID_BASE.format("0001")
+# TP9, AF7, AF8, TP10 and Right AUX, in the column order of EEG_CHANNELS.
+MUSE_EEG_UUIDS = tuple(MUSE_UUID_BASE.format(f"{characteristic:04x}") for characteristic in range(3, 8))
+
+# Channels each preset streams, counted from TP9; p20 adds Right AUX, the others turn it off.
+PRESET_CHANNELS = {"p20": 5, "p21": 4, "p22": 4, "p23": 4}
+
+MUSE_SAMPLING_RATE = 256
+SAMPLES_PER_PACKET = 12
+# 12 bit samples on a 2 mVpp range, in microvolts.
+MUSE_SCALE = 0.48828125
+
+def decode_eeg_packet(data: bytes, out: np.ndarray = None) -> tuple[int, np.ndarray]:
+    """
+        Decodes one EEG notification: a 16 bit packet counter followed by
+        12 samples of 12 bits.
+
+        Arguments:
+        - data (bytes): The 20 byte notification.
+        - out (np.ndarray): Optional array of 12 floats to decode into.
+
+        Returns:
+        - counter (int): Packet counter, wraps at 65536.
+        - samples (np.ndarray): 12 samples in microvolts.
+    """
+    counter = (data[0] << 8) | data[1]
+    pairs = np.frombuffer(data, dtype=np.uint8, count=18, offset=2).reshape(6, 3).astype(np.int32)
+    if out is None:
+        out = np.empty(SAMPLES_PER_PACKET)
+    raw = out.reshape(6, 2)
+    raw[:, 0] = (pairs[:, 0] << 4) | (pairs[:, 1] >> 4)
+    raw[:, 1] = ((pairs[:, 1] & 0x0F) << 8) | pairs[:, 2]
+    out -= 2048
+    out *= MUSE_SCALE
+    return counter, out
+
+
+def encode_command(command: str) -> bytearray:
+    """
+        Control characteristic message: length byte, ASCII command and a newline.
+    """
+    return bytearray([len(command) + 1, *command.encode("ascii"), ord("\n")])
+
+
+class MuseStream:
+    """
+        One Muse connected through bleak on the shared background loop.
+
+        Notifications of the EEG characteristics are assembled into packets
+        of 12 samples per channel; each handler is bound to its channel and
+        to this stream with functools.partial, so several headsets never mix
+        up their data. A packet is complete once every channel of the preset
+        arrived; Right AUX stays NaN for presets without it. Lost packets are counted from the
+        packet counter and skipped on the sample clock. Timestamps are the
+        sample number on a running least squares fit of the packet arrival
+        times, as muselsl does.
+
+        Complete packets are appended to the stream's EEGRingBuffer and
+        queued on its writer; nothing touches the disk on the loop thread.
+
+        Object Attributes:
+        - name (str): Muse name.
+        - address (str): BLE address.
+        - buffer (EEGRingBuffer): Most recent samples, for live checks.
+        - writer (EEGWriter): Writer the packets are passed to, if any.
+        - packets (int): Packets received.
+        - dropped (int): Packets lost according to the packet counter.
+    """
+
+    def __init__(self, name: str, address: str, writer: EEGWriter = None, preset: str = "p21",
+                 client_factory=BleakClient):
+        self.name = name
+        self.address = address
+        self.writer = writer
+        self.preset = preset
+        # Unknown presets wait for all channels; the next packet still completes the last one.
+        self._complete = (1 << PRESET_CHANNELS.get(preset, len(MUSE_EEG_UUIDS))) - 1
+        self.buffer = EEGRingBuffer(len(MUSE_EEG_UUIDS))
+        self.packets = 0
+        self.dropped = 0
+        self._client_factory = client_factory
+        self._client = None
+        self._reset()
+
+    def __str__(self):
+        return f"Muse {self.name}"
+
+    def _reset(self):
+        self._counter = None
+        self._sample_index = 0
+        self._arrival = None
+        self._received = 0
+        self._samples = np.full((len(MUSE_EEG_UUIDS), SAMPLES_PER_PACKET), np.nan)
+        # Arrival time over the sample number of the last sample of each packet.
+        self._clock = RunningFit(1 / MUSE_SAMPLING_RATE)
+
+    @property
+    def is_connected(self) -> bool:
+        return self._client is not None and self._client.is_connected
+
+    async def connect(self, timeout: float = 15) -> bool:
+        self._client = self._client_factory(self.address)
+        try:
+            await self._client.connect(timeout=timeout)
+        except (TimeoutError, BleakError) as e:
+            logging.warning(f"Could not connect to {self}: {e}")
+            return False
+        for channel, uuid in enumerate(MUSE_EEG_UUIDS):
+            await self._client.start_notify(uuid, partial(self._on_eeg, channel))
+        if self.preset:
+            await self._command(self.preset)
+        logging.info(f"Connected to {self} at {self.address}")
+        return True
+
+    async def _command(self, command: str):
+        await self._client.write_gatt_char(MUSE_CONTROL_UUID, encode_command(command), response=False)
+
+    async def start(self):
+        """
+            Starts streaming. The sample clock starts over with the first packet.
+        """
+        self._reset()
+        with latency.measure(str(self), "start"):
+            await self._command("d")
+
+    async def stop(self):
+        await self._command("h")
+        self._flush()
+
+    async def disconnect(self):
+        self._flush()
+        if self._client is not None:
+            try:
+                await self._client.disconnect()
+            except BleakError as e:
+                logging.warning(f"Could not disconnect from {self}: {e}")
+            self._client = None
+
+    def _on_eeg(self, channel: int, characteristic, data: bytearray):
+        received = time()
+        counter = (data[0] << 8) | data[1]
+        if counter != self._counter:
+            if self._received:
+                logging.debug(f"{self}: incomplete packet {self._counter}")
+                self._emit()
+            self._next_packet(counter, received)
+        decode_eeg_packet(data, self._samples[channel])
+        self._received |= 1 << channel
+        if self._received & self._complete == self._complete:
+            self._emit()
+
+    def _flush(self):
+        # A packet still missing channels is written as it is.
+        if self._received:
+            self._emit()
+
+    def _next_packet(self, counter: int, received: float):
+        if self._counter is not None:
+            step = (counter - self._counter) % 65536
+            if step > 1:
+                self.dropped += step - 1
+            self._sample_index += SAMPLES_PER_PACKET * max(step, 1)
+        self._counter = counter
+        self._arrival = received
+
+    def _emit(self):
+        # The packet was sent right after its last sample was taken.
+        last = self._sample_index + SAMPLES_PER_PACKET - 1
+        self._clock.add(last, self._arrival)
+        timestamps = self._clock.predict(np.arange(self._sample_index, last + 1, dtype=np.float64))
+        samples = self._samples
+        self._samples = np.full_like(samples, np.nan)
+        self._received = 0
+        self.packets += 1
+
+        self.buffer.append(samples, timestamps)
+        if self.writer is not None:
+            self.writer.write(samples, timestamps)
+
+
+class MuseRecorder:
+    """
+        Records several Muses at once on the shared background loop.
+
+        All headsets are found by one BLE scan and connected, started and
+        stopped with one gather each; their notifications are handled on
+        the loop thread, so N headsets need no extra threads besides their
+        EEG writers.
+
+        Object Attributes:
+        - names (list): Muse names as entered by the user; empty names match any Muse.
+        - streams (list): MuseStream per connected Muse.
+        - output_format (str): EEG writer format.
+        - directory (str): Folder the recordings are written to.
+    """
+
+    def __init__(self, names: list[str], output_format: str = "csv", directory: str = None,
+                 timing: bool = True, client_factory=BleakClient):
+        self.names = list(names)
+        self.output_format = output_format
+        self.directory = directory or os.getcwd()
+        self.timing = timing
+        self.streams: list[MuseStream] = []
+        self._client_factory = client_factory
+
+    @property
+    def buffers(self) -> list[EEGRingBuffer]:
+        return [stream.buffer for stream in self.streams]
+
+    @property
+    def filenames(self) -> list[str]:
+        return [stream.writer.filename for stream in self.streams]
+
+    def _stream(self, device: int, name: str, address: str) -> MuseStream:
+        filename = os.path.join(self.directory, f"recording{device}_%s.csv" % strftime("%Y-%m-%d-%H.%M.%S", gmtime()))
+        writer = make_writer(filename, self.output_format, timing=self.timing)
+        return MuseStream(name, address, writer, client_factory=self._client_factory)
+
+    def connect(self, addresses: dict[str, str] = None, scan_timeout: float = 10) -> bool:
+        """
+            Finds and connects every Muse.
+
+            Arguments:
+            - addresses (dict): Optional address per name, skips the BLE scan.
+            - scan_timeout (float): Maximum BLE scan time in seconds.
+
+            Returns:
+            - connected (bool): Whether every Muse was found and connected.
+        """
+        return BackgroundLoop.shared().run(self._connect(addresses, scan_timeout))
+
+    async def _connect(self, addresses: dict[str, str], scan_timeout: float) -> bool:
+        known = {}
+        if addresses is None:
+            patterns = [muse_name(name) for name in self.names]
+            wanted = {}
+            for pattern in patterns:
+                wanted[pattern] = wanted.get(pattern, 0) + 1
+            found = await BLEDiscovery.shared().find_all(wanted, scan_timeout)
+            addresses = {}
+            for pattern in patterns:
+                if not found[pattern]:
+                    logging.warning("Muse could not be found")
+                    return False
+                name, device = found[pattern].popitem()
+                addresses[name] = device.address
+                known[name] = isinstance(device, KnownDevice)
+
+        self.streams = [self._stream(device, name, address) for device, (name, address) in enumerate(addresses.items())]
+        results = await asyncio.gather(*(stream.connect() for stream in self.streams))
+        for stream, connected in zip(self.streams, results):
+            if not connected and known.get(stream.name):
+                # The address from the device registry did not work, find the Muse again.
+                await stream.disconnect()
+                device = await BLEDiscovery.shared().rescan(stream.name)
+                if device is not None:
+                    stream.address = device.address
+                    connected = await stream.connect()
+            if not connected:
+                # Headsets that did connect must not keep streaming into the shared loop.
+                await asyncio.gather(*(stream.disconnect() for stream in self.streams))
+                return False
+            if stream.name in known:
+                BLEDiscovery.shared().remember(stream.name, stream.address)
+        return True
+
+    def start(self):
+        for stream in self.streams:
+            stream.writer.start()
+        BackgroundLoop.shared().gather(*(stream.start() for stream in self.streams)).result()
+
+    def stop(self):
+        BackgroundLoop.shared().gather(*(stream.stop() for stream in self.streams), return_exceptions=True).result()
+
+    def close(self):
+        """
+            Disconnects every Muse and closes the recordings.
+        """
+        BackgroundLoop.shared().gather(*(stream.disconnect() for stream in self.streams)).result()
+        for stream in self.streams:
+            stream.writer.close()
+            logging.info(f"{stream}: {stream.packets} packets, {stream.dropped} lost")
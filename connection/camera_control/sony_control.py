@@ -1,8 +1,12 @@
 import socket
 from xml.etree import ElementTree
 import requests
-import json
 from camera_control.exceptions import CameraException, CameraNotFoundException
+from camera_control.json_rpc import JSONRPCTransport, AsyncJSONRPCTransport, check_for_errors
+from camera_control.instrumentation import latency
+from camera_control.device_registry import DeviceRegistry
+from camera_control.sony_events import SonyEventWatcher, SonyCameraState
+from camera_control.sony_liveview import LiveviewReader
 
 class SonyControl:
     """
@@ -12,12 +16,24 @@ class SonyControl:
 
         Tested on RX10.
 
+        All API calls go through a JSONRPCTransport, which keeps a persistent
+        connection to the camera.
+
         Object Attributes:
         - camera_url (str): Internal camera URL that is used to communicate with the camera.
     """
     
     def __init__(self, camera_url: str = None):
-        self._camera_url: str = camera_url
+        self._transport = JSONRPCTransport(camera_url)
+        self._events: SonyEventWatcher = None
+
+    @property
+    def _camera_url(self) -> str:
+        return self._transport.url
+
+    @_camera_url.setter
+    def _camera_url(self, camera_url: str):
+        self._transport.url = camera_url
 
     def pair_camera(self):
         """
@@ -58,11 +74,10 @@ class SonyControl:
         server.close()
 
         # Find the camera XML location 
-        response = resp.split("\r\n")
+        response = resp.decode("latin1").split("\r\n")
         for line in response:
             if line.startswith("LOCATION: "):
-                xml_location = line
-                xml_location.replace("LOCATION: ", "")
+                xml_location = line.replace("LOCATION: ", "")
 
         # Get XML describing the camera
         response = requests.get(xml_location)
@@ -90,6 +105,33 @@ class SonyControl:
         # Print camera url to console for copying.
         print(self._camera_url)
 
+    def find_camera(self, name: str = "Sony", registry: DeviceRegistry = None) -> str:
+        """
+            Uses the camera URL stored in the device registry if the camera
+            still answers there, otherwise pairs via UPNP and stores the new URL.
+
+            Arguments:
+            - name (str): Name of the camera in the registry.
+            - registry (DeviceRegistry): Registry to use, the shared one by default.
+
+            Returns:
+            - camera_url (str): The camera URL in use.
+        """
+        registry = registry or DeviceRegistry.shared()
+        camera_url = registry.address(name, "sony")
+        if camera_url is not None:
+            self._camera_url = camera_url
+            try:
+                self._transport.call("getVersions", timeout=(3.05, 3))
+                registry.remember(name, "sony", camera_url)
+                return camera_url
+            except (requests.RequestException, ValueError, CameraException):
+                registry.forget(name)
+
+        self.pair_camera()
+        registry.remember(name, "sony", self._camera_url)
+        return self._camera_url
+
     def check_for_errors(self, json_text):
         """
             Raises errors according to the error code of the given JSON text.
@@ -100,9 +142,7 @@ class SonyControl:
             - json_text: The JSON object to check.
         """
         
-        # Raise error according to json
-        if "error" in json_text:
-            raise CameraException(int(json_text["error"][0]))
+        check_for_errors(json_text)
 
     def set_camera_url(self, camera_url):
         """
@@ -125,18 +165,7 @@ class SonyControl:
             Returns:
             - json_response: Response from the camera upon the request
         """
-        data = {
-            "method": "getShootMode",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        response = requests.post(self._camera_url, data=json_data)
-        json_response = json.loads(response.text)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getShootMode")
     
     def get_supported_shoot_mode(self):
         """
@@ -146,18 +175,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "getSupportedShootMode",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        response = requests.post(self._camera_url, data=json_data)
-        json_response = json.loads(response.text)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getSupportedShootMode")
 
 
     def set_shoot_mode(self, mode: str):
@@ -172,18 +190,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "setShootMode",
-            "params": [mode],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        response = requests.post(self._camera_url, data=json_data)
-        json_response = json.loads(response.text)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("setShootMode", [mode])
 
     def take_picture(self):
         """
@@ -193,17 +200,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "actTakePicture",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("actTakePicture")
     
     def await_take_picture(self):
         """
@@ -213,17 +210,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
        
-        data = {
-            "method": "awaitTakePicture",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("awaitTakePicture")
 
     def start_movie_recording(self):
         """
@@ -233,17 +220,8 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
        
-        data = {
-            "method": "startMovieRec",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        with latency.measure(f"Sony {self._camera_url}", "start_movie_recording"):
+            return self._transport.call("startMovieRec")
 
     def stop_movie_recording(self):
         """
@@ -253,17 +231,8 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "stop_movie_recording",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        with latency.measure(f"Sony {self._camera_url}", "stop_movie_recording"):
+            return self._transport.call("stopMovieRec")
 
     def start_live_view(self):
         """
@@ -275,17 +244,24 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "startLiveview",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
+        return self._transport.call("startLiveview")
 
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+    def open_live_view(self, size: str = None, frame_info: bool = False) -> LiveviewReader:
+        """
+            Starts the live view and a reader thread that parses its frames.
+
+            Arguments:
+            - size (str): "M" or "L" to request a size, None for the camera default.
+            - frame_info (bool): Also read focus frame info packets.
+
+            Returns:
+            - reader (LiveviewReader): Call stop() on it, then stop_live_view().
+        """
+        if size is None:
+            json_response = self.start_live_view()
+        else:
+            json_response = self.start_live_view_with_size(size)
+        return LiveviewReader(json_response["result"][0], frame_info=frame_info).start()
 
     def stop_live_view(self):
         """
@@ -295,17 +271,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "stopLiveview",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("stopLiveview")
     
     def start_live_view_with_size(self, size: str):
         """
@@ -322,17 +288,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "startLiveviewWithSize",
-            "params": [size],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("startLiveviewWithSize", [size])
     
     def get_live_view_size(self):
         """
@@ -342,17 +298,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "getLiveviewsize",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getLiveviewSize")
     
     def get_supported_live_view_size(self):
         """
@@ -362,17 +308,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
        
-        data = {
-            "method": "getSupportedLiveviewSize",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getSupportedLiveviewSize")
     
     def set_live_view_frame_info(self, info: bool):
         """
@@ -385,19 +321,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        bool_text = "true" if True else "false"
-
-        data = {
-            "method": "setLiveviewFrameInfo",
-            "params": [bool_text],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("setLiveviewFrameInfo", [{"frameInfo": bool(info)}])
 
     def get_live_view_frame_info(self):
         """
@@ -407,17 +331,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "getLiveviewFrameInfo",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getLiveviewFrameInfo")
     
     def act_zoom(self, direction: str, movement: str):
         """
@@ -436,17 +350,7 @@ class SonyControl:
             - json_response: The response from the API, in JSON format.
         """
         
-        data = {
-            "method": "actZoom",
-            "params": [direction, movement],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("actZoom", [direction, movement])
     
     def set_zoom_setting(self, setting: str):
         """
@@ -472,17 +376,7 @@ class SonyControl:
             "off_digital_zoom": "Off:Digital Zoom"
         }
 
-        data = {
-            "method": "setZoomSetting",
-            "params": [zoom_settings[setting]],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("setZoomSetting", [zoom_settings[setting]])
 
     def get_zoom_setting(self):
         """
@@ -492,17 +386,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "getZoomSetting",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getZoomSetting")
 
     def get_supported_zoom_setting(self):
         """
@@ -512,17 +396,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
        
-        data = {
-            "method": "getSupportedZoomSetting",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getSupportedZoomSetting")
     
     def act_half_press_shutter(self):
         """
@@ -532,17 +406,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "actHalfPressShutter",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("actHalfPressShutter")
 
     def cancel_half_press_shutter(self):
         """
@@ -552,17 +416,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "cancelHalfPressShutter",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("cancelHalfPressShutter")
 
     def set_touch_af_position(self, x: float, y: float):
         """
@@ -576,17 +430,7 @@ class SonyControl:
             - json_response: The response from the API, in JSON format.
         """
         
-        data = {
-            "method": "getAvailableApiList",
-            "params": [x, y],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("setTouchAFPosition", [x, y])
     
     def get_touch_af_position(self):
         """
@@ -596,17 +440,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "getTouchAFPosition",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getTouchAFPosition")
     
     def cancel_touch_af_position(self):
         """
@@ -616,17 +450,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "cancelTouchAFPosition",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("cancelTouchAFPosition")
 
     def act_tracking_focus(self, x_pos: float, y_pos: float):
         """
@@ -640,20 +464,10 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "actTrackingFocus",
-            "params": [{
-                "xPosition": x_pos,
-                "yPosition": y_pos
-            }],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("actTrackingFocus", [{
+            "xPosition": x_pos,
+            "yPosition": y_pos
+        }])
 
     def cancel_tracking_focus(self):
         """
@@ -663,17 +477,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "cancelTrackingFocus",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("cancelTrackingFocus")
 
     def set_tracking_focus(self, mode: str):
         """
@@ -694,19 +498,9 @@ class SonyControl:
             "no_track": "Not Tracking"
         }
 
-        data = {
-            "method": "setTrackingFocus",
-            "params": [{
-                "trackingFocus": tf_settings[mode]
-            }],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("setTrackingFocus", [{
+            "trackingFocus": tf_settings[mode]
+        }])
 
     def get_tracking_focus(self):
         """
@@ -716,17 +510,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "getTrackingFocus",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getTrackingFocus")
     
     def get_supported_tracking_focus(self):
         """
@@ -736,17 +520,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "getSupportedTrackingFocus",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getSupportedTrackingFocus")
 
 
     def set_self_timer(self, time: int):
@@ -758,17 +532,7 @@ class SonyControl:
             by the get_supported_self_timer() method.      
         """
         
-        data = {
-            "method": "setSelfTimer",
-            "params": [time],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("setSelfTimer", [time])
 
     def get_self_timer(self):
         """
@@ -778,17 +542,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
 
-        data = {
-            "method": "getSelfTimer",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getSelfTimer")
     
     def get_supported_self_timer(self):
         """
@@ -798,17 +552,7 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "getSupportedSelfTimer",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
-
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
+        return self._transport.call("getSupportedSelfTimer")
 
     def get_available_apis(self):
         """
@@ -818,14 +562,64 @@ class SonyControl:
             - json_response: Response from the camera upon the request
         """
         
-        data = {
-            "method": "getAvailableApiList",
-            "params": [],
-            "id": 1,
-            "version": "1.0"
-        }
+        return self._transport.call("getAvailableApiList")
+
+    def start_event_watcher(self, version: str = "1.0") -> SonyEventWatcher:
+        """
+            Starts following the camera state with getEvent long polling.
+
+            Afterwards camera_state is a local read that needs no request.
+        """
+        if self._events is None:
+            self._events = SonyEventWatcher(self._camera_url, version).start()
+        return self._events
+
+    def stop_event_watcher(self):
+        if self._events is not None:
+            self._events.stop()
+            self._events = None
+
+    @property
+    def camera_state(self) -> SonyCameraState:
+        """
+            Last camera state reported by the event watcher.
+        """
+        if self._events is None:
+            raise RuntimeError("Event watcher is not running, call start_event_watcher() first")
+        return self._events.state
+
+    def confirm_recording(self, timeout: float = 5) -> bool:
+        """
+            Waits until the camera reports that it is recording a movie.
+
+            Returns:
+            - recording (bool): False if the camera did not report it within the timeout.
+        """
+        return self.start_event_watcher().wait_for_status("MovieRecording", timeout)
+
+
+class AsyncSonyControl(SonyControl):
+    """
+        asyncio variant of SonyControl.
+
+        Exposes the same API methods, but each one returns a coroutine that
+        posts over a persistent asyncio connection, so several cameras can be
+        fired from one event loop with asyncio.gather.
+
+        pair_camera() stays blocking, as it is only used during setup.
+    """
+
+    def __init__(self, camera_url: str = None):
+        self._transport = AsyncJSONRPCTransport(camera_url)
+        self._events: SonyEventWatcher = None
+
+    async def close(self):
+        await self._transport.close()
+
+    async def start_movie_recording(self):
+        with latency.measure(f"Sony {self._camera_url}", "start_movie_recording"):
+            return await self._transport.call("startMovieRec")
 
-        json_data = json.dumps(data)
-        json_response = requests.post(self._camera_url, data=json_data)
-        self.check_for_errors(json_response)
-        return json_response
\ No newline at end of file
+    async def stop_movie_recording(self):
+        with latency.measure(f"Sony {self._camera_url}", "stop_movie_recording"):
+            return await self._transport.call("stopMovieRec")
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import queue
+import struct
+import threading
+from dataclasses import dataclass
+from time import perf_counter
+import requests
+import urllib3
+from camera_control.frame_log import FrameLog
+
+# Common header: start byte, payload type, sequence number, timestamp in ms.
+COMMON_HEADER = struct.Struct(">BBHI")
+# Payload header: start code, payload size (24 bit), padding size, then 120 bytes
+# of which frame info payloads use the first 6 for version, frame count and frame size.
+PAYLOAD_HEADER = struct.Struct(">4s3sBHHH")
+PAYLOAD_HEADER_SIZE = 128
+HEADER_SIZE = COMMON_HEADER.size + PAYLOAD_HEADER_SIZE
+
+START_BYTE = 0xFF
+START_CODE = b"\x24\x35\x68\x79"
+PAYLOAD_JPEG = 0x01
+PAYLOAD_FRAME_INFO = 0x02
+
+FRAME_INFO_ENTRY = struct.Struct(">HHHHBBB5x")
+
+@dataclass
+class LiveviewFrame:
+    """
+        One liveview packet.
+
+        Frames yielded by iter_frames() point into the parser's buffer:
+        data is only valid until the next frame is read, copy it with
+        bytes(frame.data) to keep it.
+
+        Attributes:
+        - payload_type (int): PAYLOAD_JPEG or PAYLOAD_FRAME_INFO.
+        - sequence (int): Packet sequence number, wraps at 65536.
+        - timestamp (int): Camera timestamp in milliseconds.
+        - data (memoryview): JPEG image or frame info data.
+        - received (float): perf_counter() the packet was fully received.
+        - frame_count (int): Number of frame info entries.
+        - frame_size (int): Size of one frame info entry.
+    """
+    payload_type: int
+    sequence: int
+    timestamp: int
+    data: memoryview
+    received: float
+    frame_count: int = 0
+    frame_size: int = 0
+
+    @property
+    def is_jpeg(self) -> bool:
+        return self.payload_type == PAYLOAD_JPEG
+
+    def frame_info(self) -> list[tuple]:
+        """
+            Focus frames of a frame info packet as (left, top, right, bottom, category, status, additional).
+
+            Coordinates are on a 0 to 10000 scale.
+        """
+        if self.payload_type != PAYLOAD_FRAME_INFO:
+            return []
+        size = self.frame_size or FRAME_INFO_ENTRY.size
+        return [FRAME_INFO_ENTRY.unpack_from(self.data, index * size) for index in range(self.frame_count)]
+
+
+def _read_into(stream, view: memoryview):
+    while len(view):
+        read = stream.readinto(view)
+        if not read:
+            raise EOFError("Liveview stream ended")
+        view = view[read:]
+
+def iter_frames(stream, initial_size: int = 1 << 16):
+    """
+        Parses liveview packets from a binary stream with readinto().
+
+        Headers and payloads are read straight into reused buffers and the
+        frames are memoryview slices of them, so parsing a frame allocates
+        no new buffers once the buffer has grown to the largest JPEG.
+
+        Arguments:
+        - stream: File-like object, e.g. the raw body of a streamed requests response.
+        - initial_size (int): Initial payload buffer size in bytes.
+
+        Yields:
+        - frame (LiveviewFrame): Valid until the next frame is requested.
+    """
+    header = bytearray(HEADER_SIZE)
+    header_view = memoryview(header)
+    buffer = bytearray(initial_size)
+
+    while True:
+        _read_into(stream, header_view)
+        start, payload_type, sequence, timestamp = COMMON_HEADER.unpack_from(header)
+        start_code, size, padding, _, frame_count, frame_size = PAYLOAD_HEADER.unpack_from(header, COMMON_HEADER.size)
+        if start != START_BYTE or start_code != START_CODE:
+            raise ValueError("Lost synchronization with the liveview stream")
+
+        size = int.from_bytes(size, "big")
+        if size + padding > len(buffer):
+            buffer = bytearray(max(size + padding, 2 * len(buffer)))
+        view = memoryview(buffer)
+        _read_into(stream, view[:size + padding])
+
+        if payload_type == PAYLOAD_JPEG:
+            frame_count = frame_size = 0
+        yield LiveviewFrame(payload_type, sequence, timestamp, view[:size], perf_counter(), frame_count, frame_size)
+
+
+class LiveviewReader:
+    """
+        Reads a Sony liveview stream on a background thread.
+
+        Frames are parsed with iter_frames() and only JPEG frames are
+        copied out, into a small queue. When the consumer falls behind, the
+        oldest queued frame is dropped, so a slow consumer sees the newest
+        frames instead of an ever growing delay.
+
+        Object Attributes:
+        - url (str): Liveview URL returned by startLiveview.
+        - frame_info (bool): Also queue frame info packets.
+        - frames (int): JPEG frames received.
+        - dropped (int): Frames dropped because the queue was full.
+        - frame_log (FrameLog): Logs the arrival of every JPEG frame, dropped or not,
+          numbered by sequence number without the frame info packets.
+    """
+
+    def __init__(self, url: str, queue_size: int = 2, frame_info: bool = False, timeout: float = 10):
+        self.url = url
+        self.frame_info = frame_info
+        self.timeout = timeout
+        self.frames = 0
+        self.dropped = 0
+        self.frame_log: FrameLog = None
+        # Frame info packets seen, they take up sequence numbers between JPEG frames.
+        self._info_packets = 0
+        self._queue: queue.Queue[LiveviewFrame] = queue.Queue(queue_size)
+        self._running = False
+        self._response: requests.Response = None
+        self._thread: threading.Thread = None
+
+    def start(self) -> "LiveviewReader":
+        self._response = requests.get(self.url, stream=True, timeout=self.timeout)
+        self._response.raise_for_status()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sony-liveview", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1):
+        self._running = False
+        if self._response is not None:
+            self._response.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.stop_frame_log()
+
+    def _run(self):
+        try:
+            for frame in iter_frames(self._response.raw):
+                if not self._running:
+                    break
+                if not frame.is_jpeg:
+                    self._info_packets += 1
+                    if not self.frame_info:
+                        continue
+                else:
+                    self.frames += 1
+                    frame_log = self.frame_log
+                    if frame_log is not None:
+                        frame_log.record(frame.received, (frame.sequence - self._info_packets) % 65536,
+                                         frame.timestamp)
+                # The parser reuses its buffer for the next frame.
+                frame.data = memoryview(bytes(frame.data))
+                self._put(frame)
+        except (EOFError, ValueError, OSError, requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            if self._running:
+                logging.warning(f"Liveview stream {self.url} stopped: {e}")
+        finally:
+            self._running = False
+
+    def start_frame_log(self, filename: str, source: str = "Sony liveview") -> FrameLog:
+        """
+            Starts logging frame arrivals, e.g. for the duration of a recording.
+        """
+        self.stop_frame_log()
+        self.frame_log = FrameLog(filename, source)
+        return self.frame_log
+
+    def stop_frame_log(self):
+        frame_log, self.frame_log = self.frame_log, None
+        if frame_log is not None:
+            frame_log.close()
+
+    def _put(self, frame: LiveviewFrame):
+        while True:
+            try:
+                self._queue.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def get(self, timeout: float = None) -> LiveviewFrame:
+        """
+            Oldest queued frame; raises queue.Empty when none arrives within the timeout.
+        """
+        return self._queue.get(timeout=timeout)
+
+    def __iter__(self):
+        while self._running or not self._queue.empty():
+            try:
+                yield self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    async def __aiter__(self):
+        while self._running or not self._queue.empty():
+            try:
+                yield await asyncio.to_thread(self._queue.get, timeout=0.5)
+            except queue.Empty:
+                continue
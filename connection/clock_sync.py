@@ -0,0 +1,127 @@
+"""
+    NTP-style time synchronization with the Android recorder.
+
+    The host sends SYNC_REQUEST followed by its send time t0. The phone
+    answers with SYNC_REQUEST, the echoed t0, its receive time t1 and its
+    send time t2; the host notes the receive time t3. All times are integer
+    nanoseconds, big endian. Host times come from time.time_ns(), so they
+    share the EEG timestamp clock.
+
+    After START_RECORDING the phone may answer with START_RECORDING followed
+    by the phone time recording actually began.
+"""
+import struct
+from dataclasses import dataclass
+import numpy as np
+
+STOP_RECORDING = b'\0'
+START_RECORDING = b'\1'
+SYNC_REQUEST = b'\2'
+
+TIME_FORMAT = struct.Struct(">q")
+SYNC_RESPONSE_FORMAT = struct.Struct(">qqq")
+
+@dataclass
+class ClockSample:
+    """
+        One request/response exchange, in nanoseconds.
+    """
+    t0: int
+    t1: int
+    t2: int
+    t3: int
+    burst: int = 0
+
+    @property
+    def rtt(self) -> int:
+        return (self.t3 - self.t0) - (self.t2 - self.t1)
+
+    @property
+    def offset(self) -> int:
+        """
+            Phone clock minus host clock, assuming symmetric network delay.
+        """
+        return ((self.t1 - self.t0) + (self.t2 - self.t3)) // 2
+
+
+@dataclass
+class ClockEstimate:
+    """
+        Phone clock model: phone = host + offset + drift * (host - reference).
+
+        Attributes:
+        - offset (float): Phone minus host clock at the reference time, in ns.
+        - drift (float): Offset change per host nanosecond (1e-6 is 1 ppm).
+        - reference (int): Host time the offset refers to, in ns.
+        - rtt (int): Smallest round trip seen, in ns. Half of it bounds the offset error.
+        - samples (int): Number of exchanges the estimate is based on.
+    """
+    offset: float
+    drift: float
+    reference: int
+    rtt: int
+    samples: int
+
+    def offset_at(self, host_time: int) -> float:
+        return self.offset + self.drift * (host_time - self.reference)
+
+    def to_host(self, phone_time: int) -> int:
+        """
+            Converts a phone timestamp to host time, both in ns.
+        """
+        host_time = (phone_time - self.offset + self.drift * self.reference) / (1 + self.drift)
+        return int(round(host_time))
+
+    def to_phone(self, host_time: int) -> int:
+        return int(round(host_time + self.offset_at(host_time)))
+
+
+class ClockOffsetEstimator:
+    """
+        Estimates phone clock offset and drift from many exchanges.
+
+        Each synchronization burst keeps only its exchanges with the smallest
+        round trip times (the ones least disturbed by queuing on Wi-Fi). The
+        offset is the median of those; with bursts spread over a session,
+        the drift is the slope of a line fitted through all kept offsets.
+
+        Object Attributes:
+        - keep (float): Fraction of the exchanges of a burst kept by min-RTT filtering.
+    """
+
+    def __init__(self, keep: float = 0.25):
+        self.keep = keep
+        self.samples: list[ClockSample] = []
+        self._burst = 0
+
+    def new_burst(self):
+        self._burst += 1
+
+    def add(self, t0: int, t1: int, t2: int, t3: int):
+        self.samples.append(ClockSample(t0, t1, t2, t3, self._burst))
+
+    def filtered(self) -> list[ClockSample]:
+        kept = []
+        for burst in sorted({sample.burst for sample in self.samples}):
+            samples = sorted((sample for sample in self.samples if sample.burst == burst), key=lambda s: s.rtt)
+            kept += samples[:max(1, int(len(samples) * self.keep))]
+        return kept
+
+    def estimate(self) -> ClockEstimate:
+        samples = self.filtered()
+        if not samples:
+            return None
+
+        host_times = np.array([(sample.t0 + sample.t3) // 2 for sample in samples], dtype=np.int64)
+        offsets = np.array([sample.offset for sample in samples], dtype=np.float64)
+        rtt = min(sample.rtt for sample in samples)
+
+        reference = int(host_times[0])
+        elapsed = (host_times - reference).astype(np.float64)
+        drift = 0.0
+        if len({sample.burst for sample in samples}) > 1 and np.ptp(elapsed) > 0:
+            drift, offset = np.polyfit(elapsed, offsets, 1)
+        else:
+            offset = float(np.median(offsets))
+
+        return ClockEstimate(float(offset), float(drift), reference, rtt, len(samples))
@@ -3,8 +3,12 @@ from abc import ABC, abstractmethod
 class Connection(ABC):
     """Base class for all connections
     """
+    # Seconds connect_all() waits for connect() before giving up on the device.
+    CONNECT_TIMEOUT = 15
+
     @abstractmethod
     def connect(self):
+        """Connect to the device. Returns self, or None if the device could not be reached."""
         pass
     
     @abstractmethod
@@ -13,4 +17,45 @@ class Connection(ABC):
     
     @abstractmethod
     def stop_recording(self):
-        pass
\ No newline at end of file
+        pass
+
+    def arm(self):
+        """Prepare the device for an imminent start or stop trigger.
+
+        Called on the trigger worker right before it waits for release,
+        so it should only do cheap work that shortens the trigger itself.
+        """
+        pass
+
+    def disconnect(self):
+        """Release the device, e.g. before connecting the devices again."""
+        pass
+
+    def frame_rate(self):
+        """Nominal frame rate of the recorded video as set on the device, for the session manifest.
+
+        None when the device has no video or its rate cannot be queried; alignment
+        then needs a frame log or a sync marker instead of a guessed rate.
+        """
+        return None
+
+    def start_frame_log(self, filename):
+        """Start logging the arrival of preview frames, e.g. for the duration of a recording.
+
+        Returns the log file name, or None if the device has no preview stream to log.
+        """
+        return None
+
+    def stop_frame_log(self):
+        pass
+
+    def ble_name(self):
+        """Name pattern of the BLE device behind this connection, or None.
+
+        connect_all() finds every BLE device with one shared scan before
+        the devices connect.
+        """
+        return None
+
+    def __str__(self):
+        return type(self).__name__
\ No newline at end of file
@@ -0,0 +1,116 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass
+from time import perf_counter
+from .connection import Connection
+from .camera_control import BackgroundLoop, BLEDiscovery
+
+
+@dataclass
+class ConnectResult:
+    """
+        Outcome of connecting one device.
+
+        Attributes:
+        - device (str): Name of the connection.
+        - connection (Connection): The connection object.
+        - status (str): "connected", "failed" or "timeout".
+        - elapsed (float): Seconds until connect() returned or the deadline passed.
+        - error (Exception): Exception raised by connect(), if any.
+    """
+    device: str
+    connection: Connection
+    status: str
+    elapsed: float
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "connected"
+
+    def __str__(self):
+        line = f"{self.device}: {self.status} in {self.elapsed:.1f} s"
+        if self.error is not None:
+            line += f" ({self.error})"
+        return line
+
+
+def _discover_ble(connections: list[Connection], timeout: float):
+    wanted = {}
+    for connection in connections:
+        pattern = connection.ble_name()
+        if pattern is not None:
+            wanted[pattern] = wanted.get(pattern, 0) + 1
+    if not wanted:
+        return None
+    return BackgroundLoop.shared().submit(BLEDiscovery.shared().find_all(wanted, timeout))
+
+
+def _disconnect_late(connection: Connection, future):
+    if future.cancelled() or future.exception() is not None or future.result() is None:
+        return
+    logging.info(f"{connection} connected after its deadline, disconnecting it")
+    try:
+        connection.disconnect()
+    except Exception as e:
+        logging.warning(f"Could not disconnect {connection}: {e}")
+
+
+def connect_all(connections: list[Connection], timeouts: dict[type, float] = None,
+                scan_timeout: float = 10) -> list[ConnectResult]:
+    """
+        Connects every device at the same time, each with its own deadline.
+
+        Blocking connect() calls run on a thread pool; BLE devices connect
+        through the shared background loop from their worker. Setup takes as
+        long as the slowest device instead of the sum of all of them.
+        Muses and GoPros are found by a single BLE scan, started before any
+        device connects, which stops once all of them were seen.
+
+        A connection counts as failed when connect() raises or returns None.
+        Devices that miss their deadline are reported as "timeout"; their
+        worker is left to finish in the background, and if it still
+        connects, the device is disconnected again so it is not leaked.
+
+        Arguments:
+        - connections (list): Connection objects that have not been connected yet.
+        - timeouts (dict): Optional deadline overrides in seconds per Connection class.
+        Classes default to their CONNECT_TIMEOUT.
+        - scan_timeout (float): Maximum BLE scan time in seconds.
+
+        Returns:
+        - results (list): One ConnectResult per connection, in the same order.
+    """
+    timeouts = timeouts or {}
+    if not connections:
+        return []
+
+    # Submitted first so it holds the discovery lock; BLE connects then read its results from the cache.
+    scan = _discover_ble(connections, scan_timeout)
+    executor = ThreadPoolExecutor(max_workers=len(connections), thread_name_prefix="connect")
+    start = perf_counter()
+    futures = [executor.submit(connection.connect) for connection in connections]
+    finished = {}
+    for future in futures:
+        future.add_done_callback(lambda future: finished.setdefault(future, perf_counter()))
+
+    results = []
+    for connection, future in zip(connections, futures):
+        timeout = timeouts.get(type(connection), connection.CONNECT_TIMEOUT)
+        try:
+            returned = future.result(timeout=max(0, start + timeout - perf_counter()))
+            status = "connected" if returned is not None else "failed"
+            error = None
+        except TimeoutError:
+            status, error = "timeout", None
+            future.add_done_callback(lambda future, connection=connection: _disconnect_late(connection, future))
+        except Exception as e:
+            status, error = "failed", e
+        result = ConnectResult(str(connection), connection, status, finished.get(future, perf_counter()) - start, error)
+        logging.info(str(result))
+        results.append(result)
+
+    executor.shutdown(wait=False, cancel_futures=True)
+    if scan is not None and not scan.done():
+        scan.cancel()
+    return results
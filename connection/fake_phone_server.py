@@ -0,0 +1,111 @@
+import socket
+import threading
+import logging
+import random
+from time import sleep, time_ns
+from .clock_sync import START_RECORDING, STOP_RECORDING, SYNC_REQUEST, TIME_FORMAT, SYNC_RESPONSE_FORMAT
+
+class FakePhoneServer:
+    """
+        Reference implementation of the Android recorder side of the socket protocol.
+
+        Serves one SocketConnection at a time on a background thread. Its clock
+        runs with a configurable offset and drift from the host clock, and
+        every message is delayed by a random network delay, so clock
+        synchronization can be checked against a known truth without a phone.
+
+        Object Attributes:
+        - offset (int): Phone clock minus host clock at start, in ns.
+        - drift (float): Relative clock rate error (1e-6 is 1 ppm).
+        - delay (float): Maximum one way network delay, in seconds.
+        - start_delay (float): Extra delay of the start time report, in seconds.
+        - recording (bool): Whether the fake phone is recording.
+        - start_time (int): Phone time the last recording started, in ns.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, offset: int = 0, drift: float = 0.0,
+                 delay: float = 0.0, report_start: bool = True, start_delay: float = 0.0):
+        self.offset = offset
+        self.drift = drift
+        self.delay = delay
+        self.start_delay = start_delay
+        self.report_start = report_start
+        self.recording = False
+        self.start_time = None
+        self._epoch = time_ns()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen(1)
+        self.address = self._server.getsockname()
+        self._thread = threading.Thread(target=self._serve, name="fake-phone", daemon=True)
+        self._running = True
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self) -> "FakePhoneServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._server.close()
+
+    def now(self) -> int:
+        """
+            Current time on the fake phone clock, in ns.
+        """
+        host = time_ns()
+        return int(host + self.offset + self.drift * (host - self._epoch))
+
+    def _network_delay(self):
+        if self.delay:
+            sleep(random.uniform(0, self.delay))
+
+    def _serve(self):
+        while self._running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with client:
+                try:
+                    self._handle(client)
+                except (ConnectionError, OSError) as e:
+                    logging.info(f"Fake phone connection closed: {e}")
+
+    def _handle(self, client: socket.socket):
+        while True:
+            command = client.recv(1)
+            if not command:
+                return
+            self._network_delay()
+            if command == SYNC_REQUEST:
+                t0 = TIME_FORMAT.unpack(self._recv_exact(client, TIME_FORMAT.size))[0]
+                t1 = self.now()
+                response = SYNC_REQUEST + SYNC_RESPONSE_FORMAT.pack(t0, t1, self.now())
+                self._network_delay()
+                client.sendall(response)
+            elif command == START_RECORDING:
+                self.recording = True
+                self.start_time = self.now()
+                if self.report_start:
+                    sleep(self.start_delay)
+                    client.sendall(START_RECORDING + TIME_FORMAT.pack(self.start_time))
+            elif command == STOP_RECORDING:
+                self.recording = False
+
+    @staticmethod
+    def _recv_exact(client: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = client.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Connection closed by the host")
+            data += chunk
+        return bytes(data)
@@ -1,24 +1,69 @@
+import threading
 from .connection import Connection
-from .camera_control import GoProControl
-import asyncio
+from .camera_control import GoProControl, BackgroundLoop, GOPRO_NAME
 
 class GoProConnection(Connection):
-    #device_list = asyncio.run(GoProControl.search_device())
+    # Up to 10 s discovery followed by up to 15 s for the BLE connection.
+    CONNECT_TIMEOUT = 30
+    device_list = None
+    # Names held by a connected GoProConnection, so cached discovery results are not handed out twice.
+    _claimed = set()
+    _device_list_lock = threading.Lock()
+
     def __init__(self):
         self.control = GoProControl()
-    
+        self._claim = None
+
+    def __str__(self):
+        return self.control.name or "GoPro"
+
+    def ble_name(self):
+        return GOPRO_NAME
+
     def connect(self):
-        asyncio.run(self.control.connect(GoProConnection.device_list.popitem()[1]))
+        # GoPros connecting in parallel share one discovery scan.
+        with GoProConnection._device_list_lock:
+            if not GoProConnection.device_list:
+                GoProConnection.refresh(count=1)
+            if not GoProConnection.device_list:
+                print('GoPro could not be found')
+                return None
+            name, device = GoProConnection.device_list.popitem()
+            GoProConnection._claimed.add(name)
+        self._claim = name
+        BackgroundLoop.shared().run(self.control.connect(device))
+        if self.control.name is None:
+            self._release()
+            return None
         return self
+
+    def disconnect(self):
+        try:
+            BackgroundLoop.shared().run(self.control.disconnect())
+        finally:
+            self._release()
+
+    def _release(self):
+        with GoProConnection._device_list_lock:
+            GoProConnection._claimed.discard(self._claim)
+        self._claim = None
     
+    def status(self):
+        """Last GoProStatus pushed by the camera (encoding, battery, remaining storage)."""
+        return self.control.status
+
+    def frame_rate(self):
+        return BackgroundLoop.shared().run(self.control.get_fps())
+
     def start_recording(self):
-        asyncio.run(self.control.start_shutter())
+        BackgroundLoop.shared().run(self.control.start_shutter())
         return self
     
     def stop_recording(self):
-        asyncio.run(self.control.stop_shutter())
+        BackgroundLoop.shared().run(self.control.stop_shutter())
         return self
 
     @classmethod
-    def refresh(clf):
-        clf.device_list = asyncio.run(GoProControl.search_device())
\ No newline at end of file
+    def refresh(clf, count=None):
+        devices = BackgroundLoop.shared().run(GoProControl.search_device(count + len(clf._claimed) if count else None))
+        clf.device_list = {name: device for name, device in devices.items() if name not in clf._claimed}
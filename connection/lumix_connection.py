@@ -1,16 +1,55 @@
-from .camera_control.lumix_control import LumixControl
+from .camera_control.lumix_control import LumixControl, video_quality_fps
+from .camera_control import DeviceRegistry
 
 from .connection import Connection
 
 class LumixConnection(Connection):
+    CONNECT_TIMEOUT = 10
+
     def __init__(self, IP: str):
-        self.IP = IP
+        # Without an IP the camera connected last time is used.
+        self.IP = IP or DeviceRegistry.shared().address("Lumix", "lumix")
+        self.stream = None
+
+    def __str__(self):
+        return f"Lumix {self.IP}"
 
     def connect(self):
         self.control = LumixControl(self.IP)
         self.control.start_camera_control()
+        DeviceRegistry.shared().remember("Lumix", "lumix", self.IP)
         return self
 
+    def disconnect(self):
+        self.stop_frame_log()
+        if getattr(self, "control", None) is not None:
+            self.control.close()
+
+    def frame_rate(self):
+        try:
+            return video_quality_fps(self.control.get_video_quality())
+        except OSError as e:
+            print(f"Could not read the video quality of {self}: {e}")
+            return None
+
+    def start_frame_log(self, filename):
+        # The preview stream is only opened for the log; unread frames are dropped by the receiver.
+        try:
+            self.stream = self.control.open_stream()
+        except OSError as e:
+            print(f"Could not open the preview stream of {self}: {e}")
+            return None
+        self.stream.start_frame_log(filename, str(self))
+        return filename
+
+    def stop_frame_log(self):
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.stop()
+
+    def arm(self):
+        self.control.warm_up()
+
     def start_recording(self):
         self.control.video_record_start()
         return self
@@ -1,50 +1,105 @@
-from muselsl.stream import find_muse
-from muselsl import backends
-from muselsl.muse import Muse
-from time import time, strftime, gmtime
+from time import strftime, gmtime
 import os
-import numpy as np
-import pandas as pd
+import threading
 from .connection import Connection
+from .camera_control import make_writer, MuseStream, BackgroundLoop, BLEDiscovery, KnownDevice, muse_name
 
 class MuseConnection(Connection):
-    def __init__(self, name: str,):
+    # Discovery scans for up to 10 s before connecting.
+    CONNECT_TIMEOUT = 25
+    # Names held by a connected MuseConnection, so cached discovery results are not handed out twice.
+    _claimed = set()
+    _claim_lock = threading.Lock()
+
+    def __init__(self, name: str, output_format: str = "csv"):
+        # The name as entered, possibly empty for any Muse; name is the headset it resolved to.
+        self.entered_name = name
         self.name = name
+        self.output_format = output_format
+        self.stream = None
+        self._claim = None
+
+    def __str__(self):
+        return f"Muse {self.name}"
+
+    def ble_name(self):
+        return muse_name(self.entered_name)
 
     def connect(self):
-        found_muse = find_muse(self.name, 'auto')
-        if not found_muse:
+        loop = BackgroundLoop.shared()
+        device = self._claim_muse(loop)
+        if device is None:
             print('Muse could not be found')
-            return  
-        else:
-            self.address = found_muse['address']
-            self.name = found_muse['name']
-            print('Connecting to %s : %s...' % (self.name if self.name else 'Muse', self.address))
+            return None
+        if self._connect(loop, device):
+            return self
+        self._release()
+        if not isinstance(device, KnownDevice):
+            return None
+        # The address from the device registry did not work. Scan for the Muse as entered rather
+        # than the resolved name, so an unnamed entry can still take another headset that is on.
+        BLEDiscovery.shared().forget(device.name, registry=True)
+        device = self._claim_muse(loop, use_registry=False)
+        if device is None:
+            print('Muse could not be found')
+            return None
+        if self._connect(loop, device):
+            return self
+        self._release()
+        return None
+
+    def _claim_muse(self, loop, use_registry=True):
+        # Muses connecting in parallel share the discovery cache; each takes a headset nobody holds yet.
+        pattern = muse_name(self.entered_name)
+        with MuseConnection._claim_lock:
+            taken = {name for name in MuseConnection._claimed if pattern.match(name)}
+            found_muse = loop.run(BLEDiscovery.shared().find(pattern, len(taken) + 1, use_registry=use_registry))
+            for name, device in found_muse.items():
+                if name not in taken:
+                    MuseConnection._claimed.add(name)
+                    self._claim = name
+                    return device
+        return None
+
+    def _release(self):
+        with MuseConnection._claim_lock:
+            MuseConnection._claimed.discard(self._claim)
+        self._claim = None
+
+    def _connect(self, loop, device):
+        self.name = self._claim
+        self.address = device.address
+        print('Connecting to %s : %s...' % (self.name, self.address))
         self.filename = os.path.join(os.getcwd(),
             (f"recording_{self.name}_%s.csv" % strftime("%Y-%m-%d-%H.%M.%S", gmtime())))
-        self.eeg_samples = []
-        self.timestamps = []
-        def save_eeg(new_samples, new_timestamps):
-            self.eeg_samples.append(new_samples)
-            self.timestamps.append(new_timestamps)
-        self.muse = Muse(self.address, save_eeg, backend='auto')
-        self.muse.connect()
-        return self
+        self.writer = make_writer(self.filename, self.output_format, timing=True)
+        self.filename = self.writer.filename
+        # Streams through bleak on the shared loop; lost packets are counted from the packet counter.
+        self.stream = MuseStream(self.name, self.address, self.writer)
+        self.buffer = self.stream.buffer
+        if not loop.run(self.stream.connect()):
+            loop.run(self.stream.disconnect())
+            return False
+        BLEDiscovery.shared().remember(self.name, self.address)
+        return True
+
+    def disconnect(self):
+        try:
+            if self.stream is not None:
+                BackgroundLoop.shared().run(self.stream.disconnect())
+        finally:
+            self._release()
 
     def start_recording(self):
-        self.muse.start()
+        self.writer.start()
+        BackgroundLoop.shared().run(self.stream.start())
         return self
 
     def stop_recording(self):
-        self.muse.disconnect()
-        timestamps = np.concatenate(self.timestamps)
-        eeg_samples = np.concatenate(self.eeg_samples, 1).T
-        recording = pd.DataFrame(
-            data=eeg_samples, columns=['TP9', 'AF7', 'AF8', 'TP10', 'Right AUX'])
-        recording['timestamps'] = timestamps
-        directory = os.path.dirname(self.filename)
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-        recording.to_csv(self.filename, float_format='%.3f')
+        loop = BackgroundLoop.shared()
+        loop.run(self.stream.stop())
+        loop.run(self.stream.disconnect())
+        self.writer.close()
         print('Done - wrote file: ' + self.filename + '.')
+        print(f'{self.stream.packets} packets, {self.stream.dropped} lost')
         return self
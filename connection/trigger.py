@@ -0,0 +1,188 @@
+import threading
+import logging
+from dataclasses import dataclass, field
+from time import perf_counter, sleep, time
+from .connection import Connection
+
+
+@dataclass
+class TriggerResult:
+    """
+        Outcome of a single device trigger.
+
+        All times are in seconds on the perf_counter (monotonic) clock.
+
+        Attributes:
+        - device (str): Name of the connection that was triggered.
+        - dispatch (float): Time the command was handed to the device.
+        - ack (float): Time the device call returned, or None if it failed.
+        - error (Exception): Exception raised by the device, if any.
+    """
+    device: str
+    dispatch: float = None
+    ack: float = None
+    error: Exception = None
+
+    @property
+    def latency(self):
+        if self.dispatch is None or self.ack is None:
+            return None
+        return self.ack - self.dispatch
+
+
+@dataclass
+class TriggerReport:
+    """
+        Timestamps of one synchronized trigger across the rig.
+
+        Attributes:
+        - action (str): Name of the Connection method that was fired.
+        - release (float): Monotonic instant every worker was released at.
+        - wall_reference (tuple): (time(), perf_counter()) pair taken at release,
+        used to convert monotonic timestamps to wall clock time.
+        - results (list): One TriggerResult per connection, in connection order.
+    """
+    action: str
+    release: float = None
+    wall_reference: tuple = None
+    results: list = field(default_factory=list)
+
+    @property
+    def skew(self):
+        """
+            Spread between the earliest and the latest dispatch.
+        """
+        dispatches = [result.dispatch for result in self.results if result.dispatch is not None]
+        if not dispatches:
+            return None
+        return max(dispatches) - min(dispatches)
+
+    def to_wall_clock(self, timestamp):
+        """
+            Converts a perf_counter timestamp of this report to time() seconds.
+        """
+        wall, monotonic = self.wall_reference
+        return wall + (timestamp - monotonic)
+
+    def summary(self) -> list[str]:
+        """
+            One human readable line per device, relative to the release instant.
+        """
+        lines = []
+        for result in self.results:
+            if result.error is not None:
+                lines.append(f"{result.device}: failed to {self.action} ({result.error})")
+            elif result.ack is None:
+                lines.append(f"{result.device}: no response to {self.action}")
+            else:
+                lines.append(f"{result.device}: dispatch +{(result.dispatch - self.release) * 1e3:.3f} ms,"
+                             f" ack +{(result.ack - self.release) * 1e3:.3f} ms")
+        if self.skew is not None:
+            lines.append(f"{self.action} dispatch skew: {self.skew * 1e3:.3f} ms")
+        return lines
+
+    def log(self):
+        for line in self.summary():
+            logging.info(line)
+
+
+class TriggerEngine:
+    """
+        Fires the same action on many connections at one monotonic instant.
+
+        Every connection gets its own worker thread which is armed (spawned
+        and parked on a shared barrier) before the trigger. Once all workers
+        are parked, the barrier picks a release time slightly in the future
+        and every worker sleeps until that instant before calling the device,
+        so start skew no longer grows with the number of devices.
+
+        Object Attributes:
+        - connections (list): Connection objects to trigger.
+        - lead_time (float): Seconds between the barrier trip and the release instant.
+        - timeout (float): Seconds to wait for arming and for device calls to return.
+    """
+
+    def __init__(self, connections: list[Connection], lead_time: float = 0.005, timeout: float = 10):
+        self.connections = connections
+        self.lead_time = lead_time
+        self.timeout = timeout
+        self.reports: list[TriggerReport] = []
+
+    def start_recordings(self) -> TriggerReport:
+        return self.fire("start_recording")
+
+    def stop_recordings(self) -> TriggerReport:
+        return self.fire("stop_recording")
+
+    def fire(self, action: str) -> TriggerReport:
+        """
+            Calls the given Connection method on every connection at once.
+
+            Arguments:
+            - action (str): Name of the method to call, e.g. "start_recording".
+
+            Returns:
+            - report (TriggerReport): Per-device dispatch and ack timestamps.
+        """
+        report = TriggerReport(action)
+        report.results = [TriggerResult(str(connection)) for connection in self.connections]
+
+        def release():
+            report.release = perf_counter() + self.lead_time
+            report.wall_reference = (time() + self.lead_time, report.release)
+
+        release_lock = threading.Lock()
+
+        def release_now():
+            # Whoever leaves the broken barrier first sets the release instant,
+            # before any worker reads it to dispatch.
+            with release_lock:
+                if report.release is None:
+                    report.release = perf_counter()
+                    report.wall_reference = (time(), report.release)
+
+        barrier = threading.Barrier(len(self.connections) + 1, action=release, timeout=self.timeout)
+
+        workers = [
+            threading.Thread(target=self._worker, args=(connection, action, barrier, release_now, report, result), daemon=True)
+            for connection, result in zip(self.connections, report.results)
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            logging.warning(f"Not every device armed within {self.timeout} s, firing {action} anyway")
+            release_now()
+
+        for worker in workers:
+            worker.join(self.timeout)
+
+        report.log()
+        self.reports.append(report)
+        return report
+
+    def _worker(self, connection: Connection, action: str, barrier: threading.Barrier,
+                release_now, report: TriggerReport, result: TriggerResult):
+        try:
+            connection.arm()
+        except Exception as e:
+            logging.warning(f"Could not arm {result.device}: {e}")
+
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            release_now()
+
+        # Sleeping rather than spinning keeps the GIL free for the other workers.
+        remaining = report.release - perf_counter()
+        if remaining > 0:
+            sleep(remaining)
+
+        result.dispatch = perf_counter()
+        try:
+            getattr(connection, action)()
+            result.ack = perf_counter()
+        except Exception as e:
+            result.error = e
@@ -1,23 +1,24 @@
-from camera_control import GoProControl
-import asyncio
+from camera_control import GoProControl, BackgroundLoop
 from time import sleep
 import logging
 import threading
 logging.getLogger().setLevel(logging.INFO)
 
+loop = BackgroundLoop.shared()
+
 control1 = GoProControl()
 control2 = GoProControl()
 
-device_list = asyncio.run(GoProControl.search_device())
+device_list = loop.run(GoProControl.search_device(count=2))
 
 if len(device_list) > 0:
-    asyncio.run(control1.connect(device_list.popitem()[1]))
-    asyncio.run(control2.connect(device_list.popitem()[1]))
+    loop.run(control1.connect(device_list.popitem()[1]))
+    loop.run(control2.connect(device_list.popitem()[1]))
 
 def run_camera(control: GoProControl):
-    asyncio.run(control.start_shutter())
+    loop.run(control.start_shutter())
     sleep(2)
-    asyncio.run(control.stop_shutter())
+    loop.run(control.stop_shutter())
 
 thread1 = threading.Thread(target=run_camera, args=[control1])
 thread2 = threading.Thread(target=run_camera, args=[control2])
@@ -28,6 +29,6 @@ thread2.start()
 thread1.join()
 thread2.join()
 
-asyncio.run(control1.disconnect())
-asyncio.run(control2.disconnect())
+loop.gather(control1.disconnect(), control2.disconnect()).result()
+loop.stop()
 
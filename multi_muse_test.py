@@ -0,0 +1,59 @@
+"""
+    Records several fake Muses at once with MuseRecorder.
+
+    Every FakeMuseClient streams a sine of its own frequency at 256 Hz and
+    loses 1 % of its packets. Checks that each recording holds its own
+    headset's signal and every packet sent, that lost packets are counted,
+    and that the number of threads does not grow with the number of
+    headsets beyond their writers.
+"""
+from camera_control import MuseRecorder, read_recording, read_timing
+from camera_control.fake_muse import FakeMuseClient
+import numpy as np
+import tempfile
+import threading
+import time
+import logging
+logging.getLogger().setLevel(logging.INFO)
+
+HEADSETS = 4
+SECONDS = 10
+DROP_RATE = 0.01
+
+frequencies = {f"00:55:DA:B0:00:{device:02X}": 6.0 + 4 * device for device in range(HEADSETS)}
+clients = {}
+
+def make_client(address):
+    clients[address] = FakeMuseClient(address, frequencies[address], drop_rate=DROP_RATE, seed=len(clients))
+    return clients[address]
+
+with tempfile.TemporaryDirectory() as directory:
+    threads_before = threading.active_count()
+    recorder = MuseRecorder([f"Muse-{device}" for device in range(HEADSETS)], directory=directory,
+                            client_factory=make_client)
+    recorder.connect(addresses={f"Muse-{device}": address for device, address in enumerate(frequencies)})
+    recorder.start()
+    time.sleep(SECONDS)
+    threads = threading.active_count() - threads_before
+    recorder.stop()
+    recorder.close()
+
+    print(f"{HEADSETS} headsets for {SECONDS} s, {threads} threads (background loop and one writer per headset)\n")
+    print(f"{'device':<10}{'samples':>10}{'lost':>8}{'sent lost':>11}{'peak Hz':>9}{'sine Hz':>9}{'rate Hz':>10}")
+    for stream, filename in zip(recorder.streams, recorder.filenames):
+        client = clients[stream.address]
+        samples, _ = read_recording(filename)
+        spectrum = np.abs(np.fft.rfft(samples[:, 0] - samples[:, 0].mean()))
+        peak = np.fft.rfftfreq(len(samples), 1 / 256)[np.argmax(spectrum)]
+        timestamps, gaps = read_timing(filename.rsplit(".", 1)[0] + ".timing")
+        rate = (len(timestamps) + sum(gap.missing for gap in gaps) - 1) / (timestamps[-1] - timestamps[0])
+        print(f"{stream.name:<10}{len(samples):>10}{stream.dropped:>8}{client.dropped:>11}"
+              f"{peak:>9.1f}{client.frequency:>9.1f}{rate:>10.2f}")
+
+        assert len(samples) == 12 * client.sent
+        assert stream.dropped == client.dropped
+        assert sum(gap.missing for gap in gaps) == 12 * client.dropped
+        assert abs(peak - client.frequency) < 0.5
+        # The default preset p21 streams no Right AUX.
+        assert not np.isnan(samples[:, :4]).any() and np.isnan(samples[:, 4]).all()
+    assert threads <= 1 + HEADSETS
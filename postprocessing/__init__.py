@@ -0,0 +1,3 @@
+from postprocessing.manifest import SessionManifest, DeviceEntry, EEGEntry
+from postprocessing.alignment import FrameIndexMap, align_session, device_offsets, eeg_timestamps, frame_times, nearest_samples
+from postprocessing.sync_marker import SyncMarker, find_sync_marker, detect_transient, decode_audio, apply_shared_marker
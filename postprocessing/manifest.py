@@ -0,0 +1,119 @@
+import json
+import os
+from dataclasses import dataclass, field, asdict, fields
+from time import time
+
+@dataclass
+class EEGEntry:
+    """
+        One EEG recording of the session.
+
+        Attributes:
+        - device (str): Muse name.
+        - filename (str): Recording written by one of the EEG writers.
+    """
+    device: str
+    filename: str
+
+
+@dataclass
+class DeviceEntry:
+    """
+        One camera or phone of the session.
+
+        All times are time() seconds on the host, the clock of the EEG
+        timestamps.
+
+        Attributes:
+        - device (str): Device name.
+        - trigger_time (float): When the device acknowledged the start command.
+        - stop_time (float): When the device acknowledged the stop command.
+        - offset (float): Seconds from trigger_time to the first frame, e.g. a known start latency.
+        - fps (float): Nominal frame rate of the media.
+        - media (str): Recorded video file, if it was copied next to the manifest.
+        - frame_log (str): Frame arrival log of the device's preview stream.
+        - sync_marker (float): Media time of a sync marker (e.g. a clap) found in the media.
+        - marker_time (float): Host time the sync marker happened.
+    """
+    device: str
+    trigger_time: float = None
+    stop_time: float = None
+    offset: float = 0.0
+    fps: float = None
+    media: str = None
+    frame_log: str = None
+    sync_marker: float = None
+    marker_time: float = None
+
+    @property
+    def start_time(self) -> float:
+        """
+            Host time of the first frame of the media.
+
+            A sync marker found in the media is ground truth and wins over the
+            trigger time.
+        """
+        if self.sync_marker is not None and self.marker_time is not None:
+            return self.marker_time - self.sync_marker
+        if self.trigger_time is None:
+            return None
+        return self.trigger_time + self.offset
+
+
+@dataclass
+class SessionManifest:
+    """
+        Everything post-processing needs to know about a recording session.
+
+        Object Attributes:
+        - session (str): Session name, also used for the manifest file name.
+        - created (float): time() the manifest was created.
+        - eeg (list): EEGEntry per Muse.
+        - devices (list): DeviceEntry per camera or phone.
+        - notes (dict): Free form extra data, e.g. trigger latencies.
+    """
+    session: str
+    created: float = field(default_factory=time)
+    eeg: list[EEGEntry] = field(default_factory=list)
+    devices: list[DeviceEntry] = field(default_factory=list)
+    notes: dict = field(default_factory=dict)
+
+    def device(self, name: str) -> DeviceEntry:
+        for entry in self.devices:
+            if entry.device == name:
+                return entry
+        raise KeyError(name)
+
+    def add_device(self, name: str, **values) -> DeviceEntry:
+        """
+            Adds a device entry, or updates the entry of that name.
+        """
+        try:
+            entry = self.device(name)
+        except KeyError:
+            entry = DeviceEntry(name)
+            self.devices.append(entry)
+        for key, value in values.items():
+            setattr(entry, key, value)
+        return entry
+
+    def save(self, filename: str):
+        """
+            Writes the manifest as JSON. The file is replaced atomically.
+        """
+        temporary = filename + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(asdict(self), file, indent=2)
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> "SessionManifest":
+        with open(filename) as file:
+            data = json.load(file)
+        known = {item.name for item in fields(DeviceEntry)}
+        return cls(session=data["session"],
+                   created=data.get("created"),
+                   eeg=[EEGEntry(**entry) for entry in data.get("eeg", [])],
+                   devices=[DeviceEntry(**{key: value for key, value in entry.items() if key in known})
+                            for entry in data.get("devices", [])],
+                   notes=data.get("notes", {}))
@@ -0,0 +1,220 @@
+"""
+    Finds a sync marker, e.g. a clap, in the audio track of recorded video.
+
+    The audio is decoded to 16 bit mono PCM by a local ffmpeg and streamed
+    through in chunks, so files of any size are scanned in constant memory.
+    The marker is the sharpest rise of the short window energy over the
+    energy of the half second before it; silence does not count as
+    background, so sound right after digital silence is not a rise.
+
+    Usage:
+        python -m postprocessing.sync_marker session.json "GoPro 1234" GX010001.MP4
+"""
+import argparse
+import shutil
+import subprocess
+from dataclasses import dataclass
+import numpy as np
+from postprocessing.manifest import SessionManifest
+
+# Audio is decoded at this rate, enough for the onset of a clap.
+SAMPLE_RATE = 16000
+
+@dataclass
+class SyncMarker:
+    """
+        Attributes:
+        - time (float): Seconds from the start of the media to the onset of the marker.
+        - strength (float): Window energy over the floored background energy at the marker.
+    """
+    time: float
+    strength: float
+
+
+def decode_audio(media: str, sample_rate: int = SAMPLE_RATE, chunk_seconds: float = 10):
+    """
+        Decodes the audio track of a media file with ffmpeg.
+
+        Yields:
+        - chunk (np.ndarray): float32 samples in [-1, 1). The array is reused,
+        copy it to keep it past the next chunk.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise FileNotFoundError("ffmpeg is needed to decode the audio track, install it and add it to PATH")
+
+    command = [ffmpeg, "-v", "error", "-i", media, "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"]
+    buffer = bytearray(int(sample_rate * chunk_seconds) * 2)
+    view = memoryview(buffer)
+    samples = np.empty(len(buffer) // 2, dtype=np.float32)
+    with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+        while True:
+            size = 0
+            while size < len(buffer):
+                read = process.stdout.readinto(view[size:])
+                if not read:
+                    break
+                size += read
+            count = size // 2
+            if count == 0:
+                break
+            np.multiply(np.frombuffer(buffer, dtype="<i2", count=count), 1 / 32768, out=samples[:count],
+                        casting="unsafe")
+            yield samples[:count]
+            if size < len(buffer):
+                break
+    if process.returncode:
+        raise RuntimeError(f"ffmpeg could not decode {media} (exit code {process.returncode})")
+
+
+def detect_transient(chunks, sample_rate: int, window: float = 0.005, background: float = 0.5,
+                     floor: float = -70, min_rise: float = 10) -> SyncMarker:
+    """
+        Finds the sharpest transient in a stream of audio chunks.
+
+        Window energies are computed with one reshape per chunk. Each window
+        is compared to the mean energy of the windows in the preceding
+        background seconds, carried over between chunks, so the result does
+        not depend on where chunks are cut.
+
+        Recordings often start with digital silence, against which the first
+        bit of room noise would be the sharpest rise of all. Windows below
+        the floor therefore do not count as background, and a window only
+        counts as a transient when it rises min_rise over its background.
+        Sound right after silence is the marker only when no window does,
+        e.g. a clap in an otherwise digitally silent track.
+
+        Arguments:
+        - chunks: Iterable of float sample arrays, e.g. from decode_audio().
+        - sample_rate (int): Samples per second.
+        - window (float): Energy window length in seconds.
+        - background (float): Length of the background estimate in seconds.
+        - floor (float): Energy in dB relative to full scale below which a window is silence.
+        - min_rise (float): Energy ratio over the background a window needs to be a transient.
+
+        Returns:
+        - marker (SyncMarker): The transient, or None when there is none, e.g. for silent or empty audio.
+    """
+    window_size = max(1, int(sample_rate * window))
+    history = max(1, int(background / window))
+    leftover = np.zeros(0, dtype=np.float32)
+    previous = np.zeros(0)
+    windows_seen = 0
+    last_window = np.zeros(0, dtype=np.float32)
+    best = None
+    # Strongest sound right after silence, used when no window rises over a background.
+    after_silence = None
+    floor_energy = 10 ** (floor / 10)
+
+    for chunk in chunks:
+        samples = np.concatenate((leftover, chunk))
+        usable = len(samples) // window_size * window_size
+        leftover = samples[usable:].copy()
+        if not usable:
+            continue
+        frames = samples[:usable].reshape(-1, window_size)
+        energy = np.einsum("ij,ij->i", frames, frames) / window_size
+
+        # Mean of the audible windows among the preceding `history`, through running sums over previous + current.
+        joined = np.concatenate((previous, energy))
+        audible = joined >= floor_energy
+        cumulative = np.concatenate(([0.0], np.cumsum(np.where(audible, joined, 0.0))))
+        counted = np.concatenate(([0], np.cumsum(audible)))
+        end = np.arange(len(previous), len(joined))
+        start = np.maximum(end - history, 0)
+        count = counted[end] - counted[start]
+        mean = (cumulative[end] - cumulative[start]) / np.maximum(count, 1)
+        score = np.where(count > 0, energy / np.maximum(mean, floor_energy), 0.0)
+        score[score < min_rise] = 0.0
+        silent_before = (count == 0) & (end > start) & (energy >= floor_energy)
+        onset_score = np.where(silent_before, energy / floor_energy, 0.0)
+
+        offset = windows_seen * window_size
+        best = _strongest(best, score, frames, last_window, offset, sample_rate)
+        after_silence = _strongest(after_silence, onset_score, frames, last_window, offset, sample_rate)
+
+        previous = joined[-history:]
+        last_window = frames[-1].copy()
+        windows_seen += len(energy)
+
+    best = best or after_silence
+    if best is None:
+        return None
+    marker, marker_samples = best
+    # Refine to the first sample around the winning window that reaches half its peak.
+    magnitude = np.abs(marker_samples)
+    onset = int(np.argmax(magnitude >= 0.5 * magnitude.max())) if magnitude.max() > 0 else 0
+    marker.time += onset / sample_rate
+    return marker
+
+
+def _strongest(current, score, frames, last_window, offset, sample_rate):
+    # (SyncMarker, samples around it) of the highest positive score, if it beats current.
+    index = int(np.argmax(score))
+    if score[index] <= 0 or (current is not None and score[index] <= current[0].strength):
+        return current
+    # The onset may lie at the end of the window before the loudest one.
+    before = frames[index - 1] if index > 0 else last_window
+    start = offset + index * frames.shape[1] - len(before)
+    return SyncMarker(start / sample_rate, float(score[index])), np.concatenate((before, frames[index]))
+
+
+def find_sync_marker(media: str, sample_rate: int = SAMPLE_RATE, window: float = 0.005) -> SyncMarker:
+    return detect_transient(decode_audio(media, sample_rate), sample_rate, window)
+
+
+def apply_shared_marker(manifest: SessionManifest):
+    """
+        Sets marker_time of every device that has a sync marker.
+
+        All cameras heard the same clap, so its host time is estimated as the
+        median over those devices of trigger start time plus marker time;
+        trigger latency errors of single cameras drop out.
+    """
+    estimates = [entry.trigger_time + entry.offset + entry.sync_marker for entry in manifest.devices
+                 if entry.sync_marker is not None and entry.trigger_time is not None]
+    if not estimates:
+        return None
+    marker_time = float(np.median(estimates))
+    for entry in manifest.devices:
+        if entry.sync_marker is not None:
+            entry.marker_time = marker_time
+    return marker_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Finds a clap in a recording and stores it in the session manifest.")
+    parser.add_argument("manifest", help="Session manifest written by the app")
+    parser.add_argument("device", help="Device name as it appears in the manifest")
+    parser.add_argument("media", help="Video file recorded by the device")
+    parser.add_argument("--marker-time", type=float, help="Host time.time() of the clap, if it was logged")
+    args = parser.parse_args()
+
+    manifest = SessionManifest.load(args.manifest)
+    peak = 0.0
+
+    def measured(chunks):
+        nonlocal peak
+        for chunk in chunks:
+            peak = max(peak, float(np.abs(chunk).max(initial=0)))
+            yield chunk
+
+    marker = detect_transient(measured(decode_audio(args.media)), SAMPLE_RATE)
+    if marker is None and peak == 0:
+        raise SystemExit(f"No audio found in {args.media}")
+    if marker is None:
+        raise SystemExit(f"No transient above the background found in {args.media}")
+    print(f"{args.device}: marker at {marker.time:.4f} s (strength {marker.strength:.0f})")
+
+    manifest.add_device(args.device, media=args.media, sync_marker=marker.time)
+    if args.marker_time is not None:
+        for entry in manifest.devices:
+            if entry.sync_marker is not None:
+                entry.marker_time = args.marker_time
+    else:
+        apply_shared_marker(manifest)
+    manifest.save(args.manifest)
+
+
+if __name__ == "__main__":
+    main()
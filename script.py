@@ -1,9 +1,8 @@
-from camera_control import SonyControl, LumixControl, GoProControl
+from camera_control import SonyControl, LumixControl, GoProControl, BackgroundLoop
 from time import sleep
 import time
 import threading
 import logging
-import asyncio
 from muselsl import muse
 
 # Create control objects.
@@ -13,20 +12,22 @@ lumix_control = LumixControl("192.168.235.129")
 
 logging.getLogger().setLevel(logging.INFO)
 
+loop = BackgroundLoop.shared()
+
 go_control1 = GoProControl()
 go_control2 = GoProControl()
 
-device_list = asyncio.run(GoProControl.search_device())
+device_list = loop.run(GoProControl.search_device(count=2))
 
 if len(device_list) > 0:
-    asyncio.run(go_control1.connect(device_list.popitem()[1]))
-    asyncio.run(go_control2.connect(device_list.popitem()[1]))
+    loop.run(go_control1.connect(device_list.popitem()[1]))
+    loop.run(go_control2.connect(device_list.popitem()[1]))
 
 def run_camera(control: GoProControl):
-    asyncio.run(control.start_shutter())
+    loop.run(control.start_shutter())
     print(f"{control._name} started recording at {time.time()}")
     sleep(2)
-    asyncio.run(control.stop_shutter())
+    loop.run(control.stop_shutter())
 
 # Take picture command
 def lumix_take_video():
@@ -0,0 +1,38 @@
+"""
+    Checks detect_transient() on a synthetic clap.
+
+    The audio starts with a second of digital silence, as many cameras
+    record, followed by room noise and a clap at 13.0077 s. The onset of
+    noise after the silence must not be mistaken for the clap, however the
+    audio is cut into chunks. A clap in an otherwise silent track is still
+    found, and steady noise without a clap has no marker.
+"""
+from postprocessing.sync_marker import detect_transient
+import numpy as np
+
+SAMPLE_RATE = 16000
+CLAP = 13.0077
+TOLERANCE = 0.001
+
+def synthetic_audio(noise, seconds=20, clap=True):
+    random = np.random.default_rng(0)
+    audio = (noise * random.standard_normal(seconds * SAMPLE_RATE)).astype(np.float32)
+    audio[:SAMPLE_RATE] = 0
+    if not clap:
+        return audio
+    onset = int(CLAP * SAMPLE_RATE)
+    decay = np.exp(-np.arange(SAMPLE_RATE // 20) / (0.005 * SAMPLE_RATE))
+    audio[onset:onset + len(decay)] += (0.8 * decay * random.standard_normal(len(decay))).astype(np.float32)
+    return audio
+
+for noise in (0, 0.0005, 0.01, 0.05):
+    audio = synthetic_audio(noise)
+    for chunk_size in (10 * SAMPLE_RATE, 12345, len(audio)):
+        chunks = (audio[start:start + chunk_size] for start in range(0, len(audio), chunk_size))
+        marker = detect_transient(chunks, SAMPLE_RATE)
+        print(f"Noise {noise}, chunks of {chunk_size} samples: marker at {marker.time:.4f} s "
+              f"(strength {marker.strength:.0f})")
+        assert abs(marker.time - CLAP) < TOLERANCE
+
+steady = synthetic_audio(0.01, clap=False)[SAMPLE_RATE:]
+assert detect_transient([steady], SAMPLE_RATE) is None